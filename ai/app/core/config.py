@@ -1,5 +1,6 @@
 # https://fastapi.tiangolo.com/advanced/settings/ 참고
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -8,6 +9,49 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: str
     OPENAI_API_KEY: str
 
+    # Gemini Live ephemeral token 미리 발급 풀
+    EPHEMERAL_TOKEN_POOL_SIZE: int = 2  # 워커당 토큰 수, 0 이면 요청마다 발급
+    EPHEMERAL_TOKEN_NEW_SESSION_SECONDS: float = 180  # 발급 후 세션을 시작할 수 있는 시간
+    EPHEMERAL_TOKEN_MIN_REMAINING_SECONDS: float = 60  # 클라이언트에게 최소한 남겨 줄 시간 (이보다 적으면 버림)
+    EPHEMERAL_TOKEN_POOL_IDLE_SECONDS: float = 300  # 이 시간 동안 요청이 없으면 보충하지 않음
+
+    # 감정 분석 배치 스케줄러
+    EMOTION_BATCH_MAX_SIZE: int = 16
+    EMOTION_BATCH_WINDOW_MS: float = 10
+    EMOTION_QUEUE_MAX_SIZE: int = 256
+    # 감정 분석 forward 설정
+    EMOTION_PADDING: Literal["max_length", "longest"] = "max_length"
+    EMOTION_FORWARD_BATCH_SIZE: int = 16
+    EMOTION_CHUNK_WEIGHTED: bool = False  # 긴 일기의 chunk 확률을 토큰 수로 가중 평균
+    EMOTION_BACKEND: Literal["torch", "onnx", "onnx-int8"] = "torch"
+    EMOTION_PRELOAD: bool = True  # 시작 시 모델 preload + 워밍업
+    EMOTION_WARMUP_ROUNDS: int = 2
+    # 감정 분석 일괄 처리 (POST /diary/emotion/bulk)
+    EMOTION_BULK_MAX_DIARIES: int = 1000  # 요청당 최대 일기 수
+    EMOTION_BULK_CONCURRENCY: int = 32  # 동시에 배치 스케줄러에 넣을 일기 수 (최대 EMOTION_QUEUE_MAX_SIZE 의 절반)
+    EMOTION_BULK_RETRY_TIMEOUT_SECONDS: float = 60  # 대기열이 가득 찼을 때 다시 넣기를 기다리는 최대 시간
+
+    # OpenAI (일기 요약) 호출
+    OPENAI_TIMEOUT_SECONDS: float = 60
+    OPENAI_MAX_RETRIES: int = 3
+    OPENAI_MAX_CONCURRENCY: int = 8
+    OPENAI_MAX_CONNECTIONS: int = 20
+
+    # 감정 분석/일기 요약 결과 캐시
+    RESULT_CACHE_MAX_SIZE: int = 1024
+    RESULT_CACHE_TTL_SECONDS: float = 60 * 60 * 24
+    RESULT_CACHE_SQLITE_PATH: str | None = None  # 지정 시 SQLite 디스크 캐시 사용
+
+    # 일기 생성(요약 + 감정 분석) 비동기 작업
+    DIARY_JOB_WORKERS: int = 4
+    DIARY_JOB_QUEUE_MAX_SIZE: int = 100
+    DIARY_JOB_MAX_JOBS: int = 4096  # 결과를 보관할 최대 작업 수
+    DIARY_JOB_TTL_SECONDS: float = 60 * 60 * 24
+    DIARY_JOB_CALLBACK_TIMEOUT_SECONDS: float = 10
+    DIARY_JOB_CALLBACK_RETRIES: int = 3
+    DIARY_JOB_CALLBACK_ALLOWED_HOSTS: list[str] = []  # 비어 있으면 공인 IP 의 https 주소만 허용
+    DIARY_JOB_SQLITE_PATH: str | None = None  # 워커 프로세스끼리 공유할 작업 저장소 (워커가 여러 개면 필수)
+
     model_config = SettingsConfigDict(env_file=".env")
 
 
@@ -1,9 +1,39 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import APIRouter, FastAPI
 from fastapi.staticfiles import StaticFiles
 
+from core.config import get_settings
 from routes import auth, diary, system
+from services.auth import get_ephemeral_token_pool
+from services.diary_jobs import get_diary_job_queue
+from services.emotion_batcher import get_emotion_batcher
+from services.gpt_diary_summary import close_client
+from services.model_warmup import startup_state, warm_up_emotion_model
+from services.result_cache import get_result_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    if settings.EMOTION_PRELOAD:
+        # 서버는 바로 liveness에 응답하고, 모델 로딩/워밍업이 끝나면 readiness가 ok로 바뀜
+        app.state.warmup_task = asyncio.create_task(asyncio.to_thread(warm_up_emotion_model))
+    else:
+        startup_state.ready = True
+    get_emotion_batcher().start()
+    get_diary_job_queue().start()
+    get_ephemeral_token_pool().start()
+    yield
+    get_ephemeral_token_pool().stop()
+    await get_diary_job_queue().stop()
+    get_emotion_batcher().stop()
+    await close_client()
+    get_result_cache().close()
+
 
-app = FastAPI(title="AiRing", description="AiRing AI Server")
+app = FastAPI(title="AiRing", description="AiRing AI Server", lifespan=lifespan)
 
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -0,0 +1,68 @@
+"""
+두 감정 추론 경로의 라벨 일치율을 샘플 코퍼스로 확인하는 스크립트.
+
+사용법 (app 폴더 기준):
+    python -m models.agreement --corpus samples.txt --candidate-padding longest
+    python -m models.agreement --corpus samples.txt --candidate-backend onnx-int8
+
+코퍼스 파일은 한 줄에 일기 하나 형식.
+"""
+import argparse
+import json
+
+import numpy as np
+
+from models.model_def import BACKEND, PADDING, THRESHOLD, predict_probabilities_batch
+
+
+def label_agreement(reference_probs, candidate_probs, threshold: float = THRESHOLD) -> dict:
+    """
+    두 확률 배열을 threshold로 라벨화한 뒤 일치율을 계산.
+    - exactMatch: 라벨 집합이 완전히 같은 문서 비율
+    - labelAccuracy: 라벨 단위 일치 비율
+    - maxProbDiff: 확률 최대 절대 오차
+    """
+    reference_probs = np.asarray(reference_probs)
+    candidate_probs = np.asarray(candidate_probs)
+    reference_labels = reference_probs >= threshold
+    candidate_labels = candidate_probs >= threshold
+    same_docs = (reference_labels == candidate_labels).all(axis=1)
+    return {
+        "documents": int(len(reference_probs)),
+        "threshold": threshold,
+        "exactMatch": float(same_docs.mean()) if len(same_docs) else 1.0,
+        "labelAccuracy": float((reference_labels == candidate_labels).mean()) if len(same_docs) else 1.0,
+        "maxProbDiff": float(np.abs(reference_probs - candidate_probs).max()) if len(same_docs) else 0.0,
+        "mismatchedIndices": [int(i) for i in np.flatnonzero(~same_docs)],
+    }
+
+
+def _load_corpus(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="감정 추론 경로 라벨 일치율 확인")
+    parser.add_argument("--corpus", required=True, help="한 줄에 일기 하나인 텍스트 파일")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--reference-padding", default=PADDING)
+    parser.add_argument("--candidate-padding", default=None, help="기본값: reference와 동일")
+    parser.add_argument("--reference-backend", default=BACKEND)
+    parser.add_argument("--candidate-backend", default=None, help="기본값: reference와 동일")
+    args = parser.parse_args()
+
+    texts = _load_corpus(args.corpus)
+    reference = predict_probabilities_batch(
+        texts, padding=args.reference_padding, backend=args.reference_backend
+    )
+    candidate = predict_probabilities_batch(
+        texts,
+        padding=args.candidate_padding or args.reference_padding,
+        backend=args.candidate_backend or args.reference_backend,
+    )
+    print(json.dumps(label_agreement(reference, candidate, args.threshold), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+감정 분석 파이프라인 벤치마크.
+
+합성 한국어 일기 코퍼스(짧은 일기 / 512토큰 근처 / 여러 chunk)로
+단계별(kss 분할, 토크나이즈, forward, 후처리) 시간과 요청 배치 크기 x torch 스레드 수별
+지연 시간 분위수, 처리량, peak RSS 를 측정해 JSON 으로 출력.
+
+사용법 (app 폴더 기준):
+    python -m models.benchmark --output bench-torch.json
+    python -m models.benchmark --backend onnx-int8 --padding longest --output bench-int8.json
+    python -m models.benchmark --batch-sizes 1,8 --threads 1,4 --classes short,near512
+
+백엔드/설정 간 비교나 회귀 확인은 같은 --seed 로 만든 결과 JSON 끼리 비교.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+
+import torch
+
+from models.model_def import (
+    BACKEND,
+    MAX_BATCH_SIZE,
+    MAX_TOKEN,
+    MODEL_VERSION,
+    PADDING,
+    THRESHOLD,
+    get_model,
+    get_tokenizer,
+    labels_from_probs,
+    predict_probabilities_batch,
+    reset_model,
+)
+
+STAGES = ("tokenize", "kss", "forward", "post")
+
+# 합성 일기 문장 (감정 라벨이 고르게 섞이도록 구성)
+SENTENCES = [
+    "오늘은 아침 일찍 일어나서 산책을 했다.",
+    "공원에 꽃이 많이 피어 있어서 기분이 좋았다.",
+    "점심에는 오랜만에 딸이 전화를 해서 반가웠다.",
+    "무릎이 아파서 병원에 다녀왔는데 의사 선생님이 괜찮다고 하셔서 안심이 됐다.",
+    "요즘 밤에 잠이 잘 안 와서 걱정이다.",
+    "친구가 이사를 간다고 해서 조금 섭섭했다.",
+    "텔레비전에서 옛날 노래가 나와서 따라 불렀다.",
+    "혼자 저녁을 먹으니 괜히 외로운 생각이 들었다.",
+    "손주가 그린 그림을 보내 줘서 정말 고마웠다.",
+    "관리비가 또 올라서 속이 상했다.",
+    "복지관에서 배운 요가 덕분에 몸이 한결 가벼워졌다.",
+    "비가 와서 하루 종일 집에만 있었더니 답답했다.",
+    "이웃집 할머니와 시장에 가서 과일을 샀다!",
+    "내일은 아들 생일이라 미역국을 끓일 생각이다.",
+    "약 먹는 것을 깜빡해서 스스로에게 화가 났다.",
+    "오후에는 햇볕이 따뜻해서 마음이 편안했다.",
+]
+
+# 코퍼스 길이 구간: (이름, 목표 토큰 수 범위)
+LENGTH_CLASSES = {
+    "short": (10, 60),
+    "near512": (470, MAX_TOKEN - 2),
+    "multiChunk": (MAX_TOKEN * 2, MAX_TOKEN * 4),
+}
+
+
+def synthetic_corpus(tokenizer, docs_per_class: int, classes, seed: int = 0) -> dict[str, list[str]]:
+    """길이 구간별로 목표 토큰 수에 맞춰 문장을 이어 붙인 일기 생성 (seed 가 같으면 같은 코퍼스)"""
+    rng = random.Random(seed)
+    corpus = {}
+    for name in classes:
+        low, high = LENGTH_CLASSES[name]
+        docs = []
+        for _ in range(docs_per_class):
+            target = rng.randint(low, high)
+            sentences = []
+            length = 0
+            while True:
+                sentence = rng.choice(SENTENCES)
+                sentence_length = len(tokenizer.tokenize(sentence))
+                if sentences and length + sentence_length > target:
+                    break
+                sentences.append(sentence)
+                length += sentence_length
+            docs.append(" ".join(sentences))
+        corpus[name] = docs
+    return corpus
+
+
+def _corpus_stats(tokenizer, texts: list[str]) -> dict:
+    lengths = [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+    return {
+        "documents": len(texts),
+        "meanTokens": round(statistics.fmean(lengths), 1),
+        "minTokens": min(lengths),
+        "maxTokens": max(lengths),
+    }
+
+
+def _percentiles(values: list[float]) -> dict:
+    values = sorted(values)
+
+    def at(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 3)
+
+    return {
+        "mean": round(statistics.fmean(values) * 1000, 3),
+        "p50": at(0.5),
+        "p90": at(0.9),
+        "p99": at(0.99),
+        "max": round(values[-1] * 1000, 3),
+    }
+
+
+def _peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 는 KiB, macOS 는 byte 단위
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def _set_threads(backend: str, threads: int) -> None:
+    torch.set_num_threads(threads)
+    if backend != "torch":
+        # ONNX Runtime 은 세션 생성 시 스레드 수가 고정되므로 스레드 수마다 세션을 새로 만듦
+        reset_model(backend, num_threads=threads)
+
+
+def run_case(texts: list[str], batch_size: int, rounds: int, args) -> dict:
+    """texts 를 batch_size 개씩 한 요청으로 묶어 rounds 번 반복 실행"""
+    latencies = []
+    stage_timings = dict.fromkeys(STAGES, 0.0)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for i in range(0, len(texts), batch_size):
+            batch = texts[i : i + batch_size]
+            request_started = time.perf_counter()
+            probs = predict_probabilities_batch(
+                batch,
+                padding=args.padding,
+                max_batch_size=args.forward_batch_size,
+                backend=args.backend,
+                stage_timings=stage_timings,
+            )
+            post_started = time.perf_counter()
+            for p in probs:
+                labels_from_probs(p, THRESHOLD)
+            now = time.perf_counter()
+            stage_timings["post"] += now - post_started
+            latencies.append(now - request_started)
+    wall = time.perf_counter() - started
+    documents = len(texts) * rounds
+    return {
+        "batchSize": batch_size,
+        "requests": len(latencies),
+        "documents": documents,
+        "throughputDocsPerSec": round(documents / wall, 2),
+        "latencyMs": _percentiles(latencies),
+        # 문서 1건당 단계별 평균 시간
+        "stageMsPerDoc": {
+            stage: round(seconds / documents * 1000, 3) for stage, seconds in stage_timings.items()
+        },
+    }
+
+
+def run(args) -> dict:
+    started_rss = _peak_rss_mib()
+    tokenizer = get_tokenizer()
+    get_model(args.backend)
+    loaded_rss = _peak_rss_mib()
+    corpus = synthetic_corpus(tokenizer, args.docs_per_class, args.classes, args.seed)
+
+    results = []
+    for threads in args.threads:
+        _set_threads(args.backend, threads)
+        for name, texts in corpus.items():
+            # 워밍업: 첫 forward 의 메모리 할당/스레드 풀 생성 비용 제외
+            predict_probabilities_batch(
+                texts[: max(args.batch_sizes)],
+                padding=args.padding,
+                max_batch_size=args.forward_batch_size,
+                backend=args.backend,
+            )
+            for batch_size in args.batch_sizes:
+                case = run_case(texts, batch_size, args.rounds, args)
+                results.append({"threads": threads, "lengthClass": name, **case})
+                print(
+                    f"threads={threads} class={name} batch={batch_size} "
+                    f"p50={case['latencyMs']['p50']}ms docs/s={case['throughputDocsPerSec']}",
+                    file=sys.stderr,
+                )
+
+    return {
+        "config": {
+            "backend": args.backend,
+            "padding": args.padding,
+            "forwardBatchSize": args.forward_batch_size,
+            "modelVersion": MODEL_VERSION,
+            "seed": args.seed,
+            "rounds": args.rounds,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+        },
+        "corpus": {name: _corpus_stats(tokenizer, texts) for name, texts in corpus.items()},
+        "results": results,
+        "memory": {
+            "peakRssMiBBeforeLoad": started_rss,
+            "peakRssMiBAfterLoad": loaded_rss,
+            "peakRssMiB": _peak_rss_mib(),
+        },
+    }
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="감정 분석 파이프라인 벤치마크")
+    parser.add_argument("--backend", default=BACKEND, choices=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--padding", default=PADDING, choices=["max_length", "longest"])
+    parser.add_argument("--forward-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--batch-sizes", type=_int_list, default=[1, 4, 16], help="요청당 문서 수")
+    parser.add_argument("--threads", type=_int_list, default=[1, os.cpu_count() or 1])
+    parser.add_argument(
+        "--classes",
+        type=lambda v: v.split(","),
+        default=list(LENGTH_CLASSES),
+        help=f"길이 구간 ({', '.join(LENGTH_CLASSES)})",
+    )
+    parser.add_argument("--docs-per-class", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (기본값: stdout)")
+    args = parser.parse_args()
+    unknown = set(args.classes) - set(LENGTH_CLASSES)
+    if unknown:
+        parser.error(f"알 수 없는 길이 구간: {', '.join(sorted(unknown))}")
+
+    text = json.dumps(run(args), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
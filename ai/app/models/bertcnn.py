@@ -10,6 +10,7 @@ class BertCNNConfig(PretrainedConfig):
         conv_output_channels=256,
         kernel_size=3,
         pretrained_model_name="hun3359/klue-bert-base-sentiment",
+        bert_config=None,
         **kwargs
     ):
         super().__init__(**kwargs)
@@ -18,15 +19,21 @@ class BertCNNConfig(PretrainedConfig):
         self.conv_output_channels = conv_output_channels
         self.kernel_size = kernel_size
         self.pretrained_model_name = pretrained_model_name
+        # BERT 구조 설정 (dict). 있으면 hub 접근 없이 구조만 생성 가능
+        self.bert_config = bert_config
+
+    def get_bert_config(self):
+        if self.bert_config is not None:
+            bert_config = dict(self.bert_config)
+            return AutoConfig.for_model(bert_config.pop("model_type", "bert"), **bert_config)
+        return AutoConfig.from_pretrained(self.pretrained_model_name)
 
 class BertCNNForMultiLabel(PreTrainedModel):
     config_class = BertCNNConfig
     def __init__(self, config):
         super().__init__(config)
-        self.bert = AutoModel.from_pretrained(
-            config.pretrained_model_name,
-            config=AutoConfig.from_pretrained(config.pretrained_model_name)
-        )
+        # 가중치는 파인튜닝 체크포인트에서 한 번만 로딩하므로 여기서는 구조만 생성
+        self.bert = AutoModel.from_config(config.get_bert_config())
         self.conv = nn.Conv1d(
             config.hidden_size,
             config.conv_output_channels,
@@ -1,5 +1,10 @@
 import os
+import threading
+import time
+from contextlib import contextmanager
 from transformers import AutoTokenizer
+from transformers.modeling_utils import init_empty_weights
+from safetensors.torch import load_file
 from models.bertcnn import BertCNNForMultiLabel, BertCNNConfig
 import torch
 import numpy as np
@@ -12,125 +17,305 @@ EMOTION_LABELS = [
 ]
 
 MODEL_PATH = os.path.abspath(os.path.dirname(__file__))
+MODEL_VERSION = "bertcnn-v1"  # 가중치 교체 시 변경 (결과 캐시 키에 포함)
 TOKENIZER_NAME = "hun3359/klue-bert-base-sentiment"
 MAX_TOKEN = 512
 THRESHOLD = 0.54  # 최적 threshold
+# "max_length": 항상 512토큰까지 패딩 (학습 시와 동일, 기본값)
+# "longest": 배치 내 가장 긴 시퀀스까지만 패딩 (짧은 일기에서 훨씬 빠름)
+# CNN head가 패딩 위치까지 max-pooling 하므로 "longest"는 확률이 미세하게 달라질 수 있음.
+# 전환 전 models/agreement.py 로 라벨 일치율을 확인할 것.
+PADDING = "max_length"
+MAX_BATCH_SIZE = 16  # 한 번의 forward에 넣을 최대 시퀀스 수
+# 추론 백엔드: "torch"(fp32 PyTorch), "onnx"(ONNX Runtime fp32), "onnx-int8"(동적 INT8 양자화)
+BACKEND = "torch"
+ONNX_PATH = os.path.join(MODEL_PATH, "model.onnx")
+ONNX_INT8_PATH = os.path.join(MODEL_PATH, "model.int8.onnx")
 
-# 토크나이저와 모델을 지연 로딩
+# 토크나이저와 모델을 지연 로딩 (모델은 백엔드별로 한 번씩)
 _tokenizer = None
-_model = None
+_models = {}
+# 워밍업 스레드와 배치 스케줄러 스레드가 동시에 첫 로딩을 시도해도 한 번만 로딩
+_load_lock = threading.Lock()
 
 def get_tokenizer():
     global _tokenizer
     if _tokenizer is None:
-        _tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+        with _load_lock:
+            if _tokenizer is None:
+                # models/ 폴더에 토크나이저 파일이 저장되어 있으면 hub 접근 없이 로딩
+                local = os.path.exists(os.path.join(MODEL_PATH, "tokenizer.json"))
+                _tokenizer = AutoTokenizer.from_pretrained(MODEL_PATH if local else TOKENIZER_NAME)
     return _tokenizer
 
-def get_model():
-    global _model
-    if _model is None:
-        config = BertCNNConfig.from_pretrained(MODEL_PATH)
-        _model = BertCNNForMultiLabel.from_pretrained(MODEL_PATH, config=config)
-        _model.eval()
-    return _model
-
-def _split_long_sentence(sentence, tokenizer, max_tokens):
-    """긴 문장을 단어 단위로 분할"""
-    words = sentence.split()
-    chunks = []
-    current_chunk = []
+def load_torch_model(model_path=None, weights_path=None):
+    """
+    config 만으로 모델 구조를 만들고(가중치 할당 없이 meta 디바이스),
+    단일 safetensors 파일을 mmap으로 열어 파라미터에 그대로 연결.
+    base BERT 가중치를 따로 다운로드/로딩하지 않으므로 오프라인 부팅 가능.
+    """
+    model_path = model_path or MODEL_PATH
+    weights_path = weights_path or os.path.join(model_path, "model.safetensors")
+    config = BertCNNConfig.from_pretrained(model_path)
+    with init_empty_weights():
+        model = BertCNNForMultiLabel(config)
+    state_dict = load_file(weights_path)
+    # assign=True: 복사 없이 mmap된 텐서를 파라미터로 사용
+    result = model.load_state_dict(state_dict, strict=False, assign=True)
+    missing = [k for k in result.missing_keys if k in dict(model.named_parameters())]
+    if missing:
+        raise RuntimeError(f"체크포인트에 없는 파라미터: {missing}")
+    model.eval()
+    return model
+
+def _load_model(backend: str, num_threads: int | None = None):
+    if backend == "torch":
+        model = load_torch_model()
+    elif backend in ("onnx", "onnx-int8"):
+        from models.onnx_backend import OnnxBertCNN
+        model = OnnxBertCNN(ONNX_PATH if backend == "onnx" else ONNX_INT8_PATH, num_threads=num_threads)
+    else:
+        raise ValueError(f"지원하지 않는 추론 백엔드: {backend}")
+    model.eval()
+    return model
+
+def get_model(backend: str = BACKEND):
+    model = _models.get(backend)
+    if model is not None:
+        return model
+    with _load_lock:
+        if backend not in _models:
+            _models[backend] = _load_model(backend)
+        return _models[backend]
+
+def reset_model(backend: str = BACKEND, num_threads: int | None = None):
+    """
+    backend 모델을 새로 로딩해 교체 (벤치마크 등에서 스레드 수를 바꿀 때).
+    ONNX Runtime 은 세션 생성 시 스레드 수가 고정되므로 num_threads 로 새 세션을 만듦 (torch 는 torch.set_num_threads 사용).
+    """
+    with _load_lock:
+        _models[backend] = _load_model(backend, num_threads)
+        return _models[backend]
+
+def _sentence_ends(text, sentences):
+    """kss로 나눈 각 문장이 원문에서 끝나는 문자 위치 목록 (원문에서 찾지 못한 문장은 다음 문장에 합쳐짐)"""
+    ends = []
+    cursor = 0
+    for sentence in sentences:
+        start = text.find(sentence, cursor)
+        if start < 0:
+            continue
+        cursor = start + len(sentence)
+        ends.append(cursor)
+    return ends
+
+def _sentence_token_ranges(offsets, sentence_ends):
+    """토큰 offset을 문장 끝 위치 기준으로 나눠 문장별 (시작, 끝) 토큰 구간 생성"""
+    ranges = []
+    start = 0
+    s = 0
+    for i, (char_start, _) in enumerate(offsets):
+        while s < len(sentence_ends) and char_start >= sentence_ends[s]:
+            if i > start:
+                ranges.append((start, i))
+                start = i
+            s += 1
+    if start < len(offsets):
+        ranges.append((start, len(offsets)))
+    return ranges
+
+def _split_long_sentence(text, offsets, start, end, max_tokens):
+    """긴 문장(토큰 구간)을 단어(공백) 경계에서 max_tokens 이하 구간들로 분할"""
+    word_starts = [
+        i for i in range(start, end)
+        if i == start or offsets[i][0] == 0 or text[offsets[i][0] - 1].isspace()
+    ]
+    ranges = []
+    current_start = start
     current_length = 0
-    for word in words:
-        word_encoded = tokenizer.encode(word, add_special_tokens=False)
-        word_len = len(word_encoded)
+    for word_start, word_end in zip(word_starts, word_starts[1:] + [end]):
+        word_len = word_end - word_start
         if current_length + word_len > max_tokens:
-            if current_chunk:
-                chunks.append(' '.join(current_chunk))
-            current_chunk = [word]
+            if current_length:
+                ranges.append((current_start, word_start))
+            current_start = word_start
             current_length = word_len
         else:
-            current_chunk.append(word)
             current_length += word_len
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
-    return chunks
+    if current_length:
+        ranges.append((current_start, end))
+    return ranges
 
-def chunk_text_with_kss(text, tokenizer, max_tokens=512):
+def chunk_token_ids_with_kss(text, token_ids, offsets, max_tokens=512, num_special_tokens=2):
     """
-    긴 텍스트를 문장 단위로 쪼개고, 512토큰 이하로 chunk를 묶음.
-    한 문장이 512토큰을 넘으면 단어 단위로도 쪼갬.
+    한 번 토크나이즈한 결과(토큰 ID + offset mapping)를 kss 문장 경계로 묶어 chunk 생성.
+    문장 단위로 512토큰 이하 chunk를 묶고, 한 문장이 512토큰을 넘으면 단어 단위로도 쪼갬.
+    텍스트를 다시 토크나이즈하지 않고 토큰 ID를 그대로 잘라서 반환 (특수 토큰 미포함).
+    kss가 공백 없이 단어 중간에서 문장을 나누면, 문장을 따로 인코딩하던 예전 방식과
+    경계 토큰 수가 1개 정도 달라 chunk 경계가 어긋날 수 있음 (tests/test_chunking.py).
     """
-    sentences = split_sentences(str(text))
-    chunks = []
-    current_chunk = []
+    sentence_ends = _sentence_ends(text, split_sentences(str(text)))
+    ranges = []
+    current_start = current_end = 0
     current_length = 0
-    for sentence in sentences:
-        encoded = tokenizer.encode(sentence, add_special_tokens=True)
-        tokenized_len = len(encoded)
+    for start, end in _sentence_token_ranges(offsets, sentence_ends):
+        # 문장을 단독으로 인코딩했을 때의 길이(특수 토큰 포함)로 계산 -> 문장 경계가 공백/문장부호면 기존 chunk 경계와 동일
+        tokenized_len = end - start + num_special_tokens
         if tokenized_len > max_tokens:
             # 현재 청크가 있으면 먼저 추가
-            if current_chunk:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = []
+            if current_length:
+                ranges.append((current_start, current_end))
             # 긴 문장을 단어 단위로 분할하기
-            sentence_chunks = _split_long_sentence(sentence, tokenizer, max_tokens)
-            chunks.extend(sentence_chunks)
+            ranges.extend(_split_long_sentence(text, offsets, start, end, max_tokens))
             current_length = 0
             continue
-        if current_length + tokenized_len <= max_tokens:
-            current_chunk.append(sentence)
+        if current_length and current_length + tokenized_len <= max_tokens:
+            current_end = end
             current_length += tokenized_len
         else:
-            if current_chunk:
-                chunks.append(' '.join(current_chunk))
-            current_chunk = [sentence]
+            if current_length:
+                ranges.append((current_start, current_end))
+            current_start, current_end = start, end
             current_length = tokenized_len
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
-    return chunks
+    if current_length:
+        ranges.append((current_start, current_end))
+    return [token_ids[start:end] for start, end in ranges]
+
+def _forward_probs(model, inputs):
+    """토크나이즈된 배치 입력을 한 번에 forward 후 sigmoid 확률(numpy) 반환"""
+    with torch.no_grad():
+        outputs = model(**inputs)
+        logits = outputs.logits if hasattr(outputs, "logits") else outputs["logits"]
+        return torch.sigmoid(logits).cpu().numpy()
+
+def labels_from_probs(probs, threshold):
+    return [EMOTION_LABELS[i] for i, p in enumerate(probs) if p >= threshold]
 
-def predict_emotions(text: str, threshold: float = THRESHOLD):
+def _length_buckets(lengths, max_batch_size):
+    """길이순으로 정렬한 인덱스를 max_batch_size 단위로 묶음 (비슷한 길이끼리 묶어 패딩 최소화)"""
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    return [order[i:i + max_batch_size] for i in range(0, len(order), max_batch_size)]
+
+def _collate(sequences, pad_token_id, padding):
+    """토큰 ID 시퀀스 목록을 패딩해 모델 입력 텐서로 변환"""
+    length = MAX_TOKEN if padding == "max_length" else max(len(ids) for ids in sequences)
+    input_ids = torch.full((len(sequences), length), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(sequences), length), dtype=torch.long)
+    for row, ids in enumerate(sequences):
+        input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+        attention_mask[row, :len(ids)] = 1
+    return {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "token_type_ids": torch.zeros_like(input_ids),
+    }
+
+def _predict_ids_probs(sequences, tokenizer, model, padding, max_batch_size):
     """
-    입력 텍스트의 감정을 멀티라벨로 예측.
-    512토큰 초과시 chunk별 예측 후 평균 확률 사용.
-    반환값: 감정 리스트
+    토큰 ID 시퀀스(특수 토큰 포함, 패딩 전) 목록을 길이별로 묶어 forward.
+    반환값: 입력 순서와 같은 (len(sequences), len(EMOTION_LABELS)) 확률 배열
+    """
+    probs = np.zeros((len(sequences), len(EMOTION_LABELS)), dtype=np.float32)
+    lengths = [len(ids) for ids in sequences]
+    for bucket in _length_buckets(lengths, max_batch_size):
+        inputs = _collate([sequences[i] for i in bucket], tokenizer.pad_token_id, padding)
+        probs[bucket] = _forward_probs(model, inputs)
+    return probs
+
+def _aggregate_chunk_probs(chunk_probs, chunk_lengths, weighted):
+    """chunk별 확률을 문서 단위로 평균 (weighted=True면 chunk 토큰 수로 가중 평균)"""
+    weights = chunk_lengths if weighted else None
+    return np.average(chunk_probs, axis=0, weights=weights)
+
+@contextmanager
+def _stage(stage_timings, name):
+    """stage_timings 가 주어지면 해당 단계 소요 시간(초)을 누적"""
+    if stage_timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_timings[name] = stage_timings.get(name, 0.0) + time.perf_counter() - started
+
+def predict_probabilities_batch(
+    texts: list[str],
+    padding: str = PADDING,
+    max_batch_size: int = MAX_BATCH_SIZE,
+    weighted: bool = False,
+    backend: str = BACKEND,
+    stage_timings: dict | None = None,
+):
+    """
+    여러 입력 텍스트의 감정 확률을 한 번에 계산.
+    512토큰 이하 텍스트는 그대로, 512토큰 초과 텍스트는 chunk로 분할한 뒤
+    모든 시퀀스를 길이순으로 묶어 max_batch_size 단위로 forward.
+    긴 텍스트는 chunk별 확률의 평균 사용 (weighted=True면 chunk 토큰 수로 가중 평균).
+    stage_timings 에 dict를 넘기면 단계별(tokenize, kss, forward, post) 소요 시간을 누적 (벤치마크용).
+    반환값: (len(texts), len(EMOTION_LABELS)) 크기의 확률 배열
     """
     try:
         tokenizer = get_tokenizer()
-        model = get_model()
+        model = get_model(backend)
     except Exception as e:
         raise RuntimeError(f"모델 로딩 실패: {e}")
-    # 입력 텍스트 토큰 개수 확인
-    encoded = tokenizer.encode(text, add_special_tokens=True)
-    if len(encoded) <= MAX_TOKEN:
-        # 512토큰 이하: 바로 예측
-        try:
-            inputs = tokenizer(
-                text, return_tensors="pt", truncation=True, max_length=MAX_TOKEN, padding="max_length"
-            )
-            with torch.no_grad():
-                outputs = model(**inputs)
-                logits = outputs.logits if hasattr(outputs, "logits") else outputs["logits"]
-                probs = torch.sigmoid(logits).cpu().numpy()[0]
-            predicted = [EMOTION_LABELS[i] for i, p in enumerate(probs) if p >= threshold]
-            return predicted
-        except Exception as e:
-            raise RuntimeError(f"감정 예측 실패: {e}")
-    # 512토큰 초과: chunk로 분할 후 chunk별 예측, 평균 확률 산출
+    results = np.zeros((len(texts), len(EMOTION_LABELS)), dtype=np.float32)
+    if not texts:
+        return results
+    # 입력 텍스트 전체를 offset mapping과 함께 한 번만 인코딩 (fast tokenizer 필요)
+    # 토큰 개수 확인, chunk 분할, 모델 입력 모두 이 결과를 그대로 사용
+    with _stage(stage_timings, "tokenize"):
+        encoded = tokenizer(list(texts), add_special_tokens=False, return_offsets_mapping=True)
+    num_special_tokens = tokenizer.num_special_tokens_to_add()
+    max_content_tokens = MAX_TOKEN - num_special_tokens
+    # 문서별로 forward 할 시퀀스 목록을 모아 한 번에 배치 처리
+    batch_sequences = []
+    owners = []
+    try:
+        with _stage(stage_timings, "kss"):
+            for i, (ids, offsets) in enumerate(zip(encoded["input_ids"], encoded["offset_mapping"])):
+                if len(ids) <= max_content_tokens:
+                    chunks = [ids]
+                else:
+                    # 512토큰 초과: chunk로 분할
+                    chunks = chunk_token_ids_with_kss(
+                        texts[i], ids, offsets, max_tokens=MAX_TOKEN, num_special_tokens=num_special_tokens
+                    )
+                for chunk in chunks:
+                    batch_sequences.append(tokenizer.build_inputs_with_special_tokens(chunk[:max_content_tokens]))
+                    owners.append(i)
+    except Exception as e:
+        raise RuntimeError(f"긴 텍스트 분할 실패: {e}")
     try:
-        chunks = chunk_text_with_kss(text, tokenizer, max_tokens=MAX_TOKEN)
-        all_probs = []
-        for chunk in chunks:
-            inputs = tokenizer(
-                chunk, return_tensors="pt", truncation=True, max_length=MAX_TOKEN, padding="max_length"
-            )
-            with torch.no_grad():
-                outputs = model(**inputs)
-                logits = outputs.logits if hasattr(outputs, "logits") else outputs["logits"]
-                probs = torch.sigmoid(logits).cpu().numpy()[0]
-                all_probs.append(probs)
-        mean_probs = np.mean(all_probs, axis=0)
-        predicted = [EMOTION_LABELS[i] for i, p in enumerate(mean_probs) if p >= threshold]
-        return predicted
+        with _stage(stage_timings, "forward"):
+            probs = _predict_ids_probs(batch_sequences, tokenizer, model, padding, max_batch_size)
     except Exception as e:
-        raise RuntimeError(f"긴 텍스트 감정 예측 실패: {e}")
+        raise RuntimeError(f"감정 예측 실패: {e}")
+    with _stage(stage_timings, "post"):
+        owners = np.asarray(owners)
+        lengths = np.asarray([len(ids) for ids in batch_sequences], dtype=np.float32)
+        for i in range(len(texts)):
+            mask = owners == i
+            results[i] = _aggregate_chunk_probs(probs[mask], lengths[mask], weighted)
+    return results
+
+def predict_emotions_batch(
+    texts: list[str], threshold: float = THRESHOLD, padding: str = PADDING, backend: str = BACKEND
+):
+    """
+    여러 입력 텍스트의 감정을 한 번에 멀티라벨로 예측.
+    반환값: 입력 순서와 같은 감정 리스트의 리스트
+    """
+    probs = predict_probabilities_batch(texts, padding=padding, backend=backend)
+    return [labels_from_probs(p, threshold) for p in probs]
+
+def predict_emotions(
+    text: str, threshold: float = THRESHOLD, padding: str = PADDING, backend: str = BACKEND
+):
+    """
+    입력 텍스트의 감정을 멀티라벨로 예측.
+    512토큰 초과시 chunk별 예측 후 평균 확률 사용.
+    반환값: 감정 리스트
+    """
+    return predict_emotions_batch([text], threshold, padding, backend)[0]
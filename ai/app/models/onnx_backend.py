@@ -0,0 +1,133 @@
+"""
+BertCNNForMultiLabel 의 ONNX Runtime 추론 백엔드.
+
+사용법 (app 폴더 기준):
+    python -m models.onnx_backend export          # models/model.onnx 생성
+    python -m models.onnx_backend export --int8   # + models/model.int8.onnx (동적 INT8 양자화)
+
+생성 후 EMOTION_BACKEND=onnx 또는 EMOTION_BACKEND=onnx-int8 로 선택.
+"""
+import argparse
+import os
+
+import numpy as np
+import torch
+
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+OUTPUT_NAMES = ["logits"]
+DYNAMIC_AXES = {name: {0: "batch", 1: "sequence"} for name in INPUT_NAMES}
+DYNAMIC_AXES["logits"] = {0: "batch"}
+
+
+def _import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise RuntimeError("ONNX 백엔드를 사용하려면 onnxruntime 설치가 필요합니다.") from e
+    return onnxruntime
+
+
+class _ExportableBertCNN(torch.nn.Module):
+    """
+    export 용 래퍼: dict 대신 logits 텐서만 반환.
+    AdaptiveMaxPool1d(1)은 export 시 dummy 입력 길이로 kernel 크기가 고정되므로
+    시퀀스 축 max(amax)로 바꿔 동적 길이에서도 같은 결과가 나오도록 함.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        outputs = self.model.bert(
+            input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+        )
+        x = outputs.last_hidden_state.transpose(1, 2)
+        x = self.model.relu(self.model.conv(x))
+        x = torch.amax(x, dim=-1)
+        return self.model.classifier(x)
+
+
+def export_onnx(model, output_path: str, opset: int = 17) -> str:
+    """BERT + Conv1d head 전체를 batch/sequence 동적 축을 가진 ONNX 그래프로 export"""
+    # export 후 학습 모드로 복원되지 않도록 래퍼까지 eval 모드로 고정
+    wrapper = _ExportableBertCNN(model).eval()
+    dummy = torch.ones((1, 16), dtype=torch.long)
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            (dummy, dummy, torch.zeros_like(dummy)),
+            output_path,
+            input_names=INPUT_NAMES,
+            output_names=OUTPUT_NAMES,
+            dynamic_axes=DYNAMIC_AXES,
+            opset_version=opset,
+            dynamo=False,
+        )
+    return output_path
+
+
+def quantize_onnx(input_path: str, output_path: str) -> str:
+    """가중치를 INT8로 동적 양자화 (활성값은 실행 시 양자화)"""
+    _import_onnxruntime()
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(input_path, output_path, weight_type=QuantType.QInt8)
+    return output_path
+
+
+class OnnxBertCNN:
+    """
+    ONNX Runtime 세션을 BertCNNForMultiLabel 과 같은 호출 형태로 감싼 래퍼.
+    model(input_ids=..., attention_mask=..., token_type_ids=...) -> {"logits": Tensor}
+    """
+
+    def __init__(self, path: str, num_threads: int | None = None):
+        ort = _import_onnxruntime()
+        if not os.path.exists(path):
+            raise RuntimeError(
+                f"ONNX 모델 파일이 없습니다: {path} (python -m models.onnx_backend export 로 생성)"
+            )
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def eval(self):
+        return self
+
+    def __call__(self, input_ids, attention_mask=None, token_type_ids=None):
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        if token_type_ids is None:
+            token_type_ids = torch.zeros_like(input_ids)
+        feeds = {
+            "input_ids": input_ids.numpy().astype(np.int64, copy=False),
+            "attention_mask": attention_mask.numpy().astype(np.int64, copy=False),
+            "token_type_ids": token_type_ids.numpy().astype(np.int64, copy=False),
+        }
+        (logits,) = self.session.run(OUTPUT_NAMES, feeds)
+        return {"logits": torch.from_numpy(logits)}
+
+
+def main():
+    from models.model_def import ONNX_INT8_PATH, ONNX_PATH, get_model
+
+    parser = argparse.ArgumentParser(description="BertCNNForMultiLabel ONNX export")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("--output", default=ONNX_PATH)
+    export_parser.add_argument("--int8", action="store_true", help="INT8 동적 양자화 모델도 생성")
+    export_parser.add_argument("--int8-output", default=ONNX_INT8_PATH)
+    export_parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    print("export:", export_onnx(get_model("torch"), args.output, args.opset))
+    if args.int8:
+        print("quantize:", quantize_onnx(args.output, args.int8_output))
+
+
+if __name__ == "__main__":
+    main()
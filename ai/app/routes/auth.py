@@ -1,13 +1,11 @@
-from core.config import Settings, get_settings
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter
 from schemas.auth import IssueEphemeralTokenResponse
-from services.auth import create_ephemeral_token
+from services.auth import get_ephemeral_token_pool
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/ephemeral-token")
-def issue_ephemeral_token(
-    settings: Settings = Depends(get_settings),
-) -> IssueEphemeralTokenResponse:
-    return {"ephemeralToken": create_ephemeral_token(settings.GEMINI_API_KEY)}
+def issue_ephemeral_token() -> IssueEphemeralTokenResponse:
+    # 미리 발급해 둔 토큰을 꺼냄 (풀이 비어 있으면 바로 발급)
+    return {"ephemeralToken": get_ephemeral_token_pool().take()}
@@ -1,22 +1,180 @@
+import json
 from typing import List
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
 
-from schemas.diary import Message, DiaryEmotionRequest, DiaryEmotionResponse
-from services.gpt_diary_summary import generate_diary_from_dialogue
-from services.diary_emotion import analyze_diary_emotion
+from core.config import Settings, get_settings
+from models.model_def import EMOTION_LABELS, THRESHOLD
+from schemas.diary import (
+    Message,
+    BulkDiaryEmotionRequest,
+    DiaryEmotionRequest,
+    DiaryEmotionResponse,
+    EmotionLabelsResponse,
+    DiaryJobRequest,
+    DiaryJobResponse,
+    SessionDiaryRequest,
+)
+from services.gpt_diary_summary import generate_diary_from_dialogue, stream_diary_from_dialogue
+from services.diary_emotion import (
+    format_emotion_result,
+    get_emotion_model_version,
+    get_emotion_probabilities_async,
+    iter_emotion_probabilities,
+)
+from services.emotion_batcher import EmotionBatcherStoppedError, EmotionQueueFullError
+from services.result_cache import is_cache_bypassed
+from services.diary_jobs import (
+    DiaryJobQueueFullError,
+    InvalidCallbackUrlError,
+    get_diary_job_queue,
+)
 
 router = APIRouter(prefix="/diary", tags=["diary"])
 
 
+def _to_raw_script(messages: List[Message]) -> str:
+    return "\n".join(f"{msg.from_}: {msg.message}" for msg in messages)
+
+
 @router.post("/summary")
-def summarize_diary(messages: List[Message]):
-    raw_script = "\n".join(f"{msg.from_}: {msg.message}" for msg in messages)
-    result = generate_diary_from_dialogue(raw_script)
+async def summarize_diary(
+    messages: List[Message],
+    cache_control: str | None = Header(default=None),
+):
+    result = await generate_diary_from_dialogue(
+        _to_raw_script(messages), use_cache=not is_cache_bypassed(cache_control)
+    )
     return result
 
 
-@router.post("/emotion", response_model=DiaryEmotionResponse)
-def diary_emotion(request: DiaryEmotionRequest):
-    emotion_list = analyze_diary_emotion(request.content)
-    return DiaryEmotionResponse(emotionList=emotion_list)
\ No newline at end of file
+@router.post("/summary/stream")
+async def summarize_diary_stream(
+    messages: List[Message],
+    cache_control: str | None = Header(default=None),
+):
+    """일기 제목/내용 토큰을 생성되는 대로 SSE(text/event-stream)로 전송"""
+    raw_script = _to_raw_script(messages)
+    use_cache = not is_cache_bypassed(cache_control)
+
+    async def event_stream():
+        try:
+            async for event, data in stream_diary_from_dialogue(raw_script, use_cache):
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/emotion", response_model=DiaryEmotionResponse, response_model_exclude_none=True)
+async def diary_emotion(
+    request: DiaryEmotionRequest,
+    cache_control: str | None = Header(default=None),
+):
+    """
+    감정 라벨 목록. 선택적으로 요청별 threshold, topK, 라벨별 확률(probabilities)을 함께 반환.
+    확률은 캐시된 값을 그대로 사용하므로 threshold 만 바꿔 다시 요청해도 재추론하지 않음.
+    """
+    try:
+        probs = await get_emotion_probabilities_async(
+            request.content, use_cache=not is_cache_bypassed(cache_control)
+        )
+    except (EmotionQueueFullError, EmotionBatcherStoppedError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return format_emotion_result(probs, request.threshold, request.top_k, request.probabilities)
+
+
+@router.get("/emotion/labels", response_model=EmotionLabelsResponse)
+async def emotion_labels():
+    """probabilitiesFloat16 배열의 라벨 순서와 기본 threshold"""
+    return EmotionLabelsResponse(
+        labels=EMOTION_LABELS, threshold=THRESHOLD, modelVersion=get_emotion_model_version()
+    )
+
+
+@router.post("/emotion/bulk")
+async def diary_emotion_bulk(
+    request: BulkDiaryEmotionRequest,
+    cache_control: str | None = Header(default=None),
+    settings: Settings = Depends(get_settings),
+):
+    """
+    여러 일기의 감정 분석 결과를 입력 순서대로 NDJSON(한 줄에 일기 하나)으로 전송 (과거 일기 backfill 용).
+    각 줄: {"index", "id", "emotionList", ...} 또는 실패 시 {"index", "id", "error"}
+    """
+    if len(request.diaries) > settings.EMOTION_BULK_MAX_DIARIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"요청당 최대 {settings.EMOTION_BULK_MAX_DIARIES}개의 일기만 처리할 수 있습니다.",
+        )
+    results = iter_emotion_probabilities(
+        [diary.content for diary in request.diaries],
+        use_cache=not is_cache_bypassed(cache_control),
+    )
+
+    async def ndjson_stream():
+        async for index, probs in results:
+            line = {"index": index, "id": request.diaries[index].id}
+            if isinstance(probs, Exception):
+                line["error"] = str(probs)
+            else:
+                line.update(
+                    format_emotion_result(
+                        probs, request.threshold, request.top_k, request.probabilities
+                    )
+                )
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+
+@router.post("/jobs", response_model=DiaryJobResponse, status_code=202)
+async def submit_diary_job(request: DiaryJobRequest, response: Response):
+    """
+    일기 요약 + 감정 분석 작업을 대기열에 넣고 작업 ID를 바로 반환.
+    결과는 GET /jobs/{jobId} 로 조회하거나 callbackUrl 로 받음. 같은 대화는 기존 작업을 재사용.
+    """
+    try:
+        job = await get_diary_job_queue().submit(
+            _to_raw_script(request.messages), callback_url=request.callback_url
+        )
+    except InvalidCallbackUrlError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DiaryJobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    response.headers["Location"] = f"/api/diary/jobs/{job['jobId']}"
+    return DiaryJobResponse(**job)
+
+
+@router.get("/jobs/{job_id}", response_model=DiaryJobResponse)
+async def get_diary_job(job_id: str):
+    job = await get_diary_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return DiaryJobResponse(**job)
+
+
+@router.post("/sessions", response_model=DiaryJobResponse, status_code=202)
+async def submit_session_diary(request: SessionDiaryRequest):
+    """proxy 가 통화 종료 시 넘겨준 대화록으로 일기 생성 작업 시작 (세션 ID 로 조회 가능)"""
+    try:
+        job = await get_diary_job_queue().submit_session(
+            request.session_id, _to_raw_script(request.messages)
+        )
+    except DiaryJobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return DiaryJobResponse(**job)
+
+
+@router.get("/sessions/{session_id}", response_model=DiaryJobResponse)
+async def get_session_diary(session_id: str):
+    job = await get_diary_job_queue().get_by_session(session_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return DiaryJobResponse(**job)
@@ -1,5 +1,11 @@
 from fastapi import APIRouter
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
+
+from services.auth import get_ephemeral_token_pool
+from services.diary_jobs import get_diary_job_queue
+from services.emotion_batcher import get_emotion_batcher
+from services.model_warmup import startup_state
+from services.result_cache import get_result_cache
 
 router = APIRouter(tags=["system"])
 
@@ -10,5 +16,26 @@ def root():
 
 
 @router.get("/health-check")
+@router.get("/health/live")
 def health_check():
+    """liveness: 프로세스가 요청에 응답할 수 있는지만 확인"""
     return {"status": "ok"}
+
+
+@router.get("/health/ready")
+def readiness_check():
+    """readiness: 모델 preload/워밍업이 끝나 트래픽을 받을 수 있는지 확인"""
+    state = startup_state.snapshot()
+    if not state["ready"]:
+        return JSONResponse(status_code=503, content={"status": "starting", **state})
+    return {"status": "ok", **state}
+
+
+@router.get("/metrics")
+def metrics():
+    return {
+        "emotionBatcher": get_emotion_batcher().stats(),
+        "resultCache": get_result_cache().stats(),
+        "diaryJobs": get_diary_job_queue().stats(),
+        "ephemeralTokenPool": get_ephemeral_token_pool().stats(),
+    }
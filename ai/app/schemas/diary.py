@@ -1,16 +1,73 @@
-from pydantic import BaseModel, Field
-from typing import List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Literal
+
+from models.model_def import EMOTION_LABELS
 
 class Message(BaseModel):
     from_: str = Field(alias="from")
     message: str
 
 
-class DiaryEmotionRequest(BaseModel):
+class EmotionOutputOptions(BaseModel):
+    threshold: float | None = Field(default=None, ge=0, le=1)  # 기본값: 모델 THRESHOLD
+    top_k: int | None = Field(default=None, alias="topK", ge=1, le=len(EMOTION_LABELS))
+    # "rounded": 라벨별 확률, "float16": EMOTION_LABELS 순서 float16 배열(base64)
+    probabilities: Literal["none", "rounded", "float16"] = "none"
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class DiaryEmotionRequest(EmotionOutputOptions):
     content: str
 
+class EmotionScore(BaseModel):
+    label: str
+    probability: float
+
 class DiaryEmotionResponse(BaseModel):
     emotion_list: List[str] = Field(..., alias="emotionList")
+    top_emotions: List[EmotionScore] | None = Field(default=None, alias="topEmotions")
+    probabilities: Dict[str, float] | None = None
+    probabilities_float16: str | None = Field(default=None, alias="probabilitiesFloat16")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class BulkDiary(BaseModel):
+    id: str | None = None
+    content: str
+
+
+class BulkDiaryEmotionRequest(EmotionOutputOptions):
+    diaries: List[BulkDiary]
+
+
+class EmotionLabelsResponse(BaseModel):
+    labels: List[str]
+    threshold: float
+    model_version: str = Field(..., alias="modelVersion")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+class SessionDiaryRequest(BaseModel):
+    # proxy 가 만든 uuid4 hex 만 허용 (추측 가능한 임의 ID 로 다른 사람의 일기를 조회하지 못하도록)
+    session_id: str = Field(..., alias="sessionId", pattern="^[0-9a-f]{32}$")
+    messages: List[Message]
+
+
+class DiaryJobRequest(BaseModel):
+    messages: List[Message]
+    callback_url: str | None = Field(default=None, alias="callbackUrl")
+
+
+class DiaryJobResponse(BaseModel):
+    job_id: str = Field(..., alias="jobId")
+    status: Literal["queued", "running", "done", "failed"]
+    title: str | None = None
+    content: str | None = None
+    emotion_list: List[str] | None = Field(default=None, alias="emotionList")
+    error: str | None = None
+    created_at: float | None = Field(default=None, alias="createdAt")
+    finished_at: float | None = Field(default=None, alias="finishedAt")
 
-    class Config:
-        allow_population_by_field_name = True
\ No newline at end of file
+    model_config = ConfigDict(populate_by_name=True)
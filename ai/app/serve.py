@@ -0,0 +1,176 @@
+"""
+pre-fork 방식 멀티 프로세스 서버.
+
+부모 프로세스에서 감정 분석 모델을 한 번만 로딩한 뒤 워커들을 fork 하므로,
+모델 가중치(mmap 된 safetensors)와 토크나이저 메모리를 모든 워커가 copy-on-write 로 공유함.
+워커 수를 늘려도 노드 메모리가 워커 수에 비례해 늘어나지 않음.
+
+사용법 (app 폴더 기준, Linux/macOS):
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+from uvicorn.logging import DefaultFormatter
+
+from core.config import get_settings
+from models.model_def import get_model, get_tokenizer
+
+# 워커가 시작 직후 계속 죽는 경우(import/설정 오류 등) fork 를 반복하지 않도록 재시작 제한
+RAPID_EXIT_SECONDS = 10  # fork 후 이 시간 안에 종료되면 연속 실패로 셈
+MAX_RAPID_FAILURES = 5  # 연속 실패가 이만큼 쌓이면 서버 종료
+RESTART_BACKOFF_SECONDS = 1  # 재시작 대기 시간 (연속 실패마다 2배, 최대 RESTART_BACKOFF_MAX_SECONDS)
+RESTART_BACKOFF_MAX_SECONDS = 30
+
+logger = logging.getLogger(__name__)
+
+
+def _configure_logging(level: str) -> None:
+    """
+    부모(supervisor) 로그도 워커의 uvicorn 로그와 같은 형식/레벨로 출력.
+    kss 가 import 시 root logger 에 자체 handler 를 붙이므로 root 대신 이 모듈 logger 에 직접 연결.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(DefaultFormatter("%(levelprefix)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(level.upper())
+    logger.propagate = False
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _preload(backend: str) -> None:
+    """
+    fork 전에 토크나이저/모델 로딩.
+    forward는 실행하지 않음: 부모에서 OpenMP 스레드 풀이 만들어진 뒤 fork 하면 워커가 멈출 수 있음.
+    ONNX Runtime 세션도 fork 후 공유가 안전하지 않으므로 torch 백엔드만 preload.
+    """
+    get_tokenizer()
+    if backend == "torch":
+        get_model(backend)
+    # 이후 GC가 공유 객체의 헤더를 건드려 페이지가 복사되는 것을 줄임
+    gc.collect()
+    gc.freeze()
+
+
+def _run_worker(sock: socket.socket, args) -> None:
+    import torch
+
+    torch.set_num_threads(args.threads)
+    config = uvicorn.Config("main:app", log_level=args.log_level, proxy_headers=True)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        code = 0
+        try:
+            _run_worker(sock, args)
+        except BaseException:
+            logger.exception("Worker %d crashed", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main() -> None:
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="AiRing AI pre-fork server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", 1)))
+    parser.add_argument(
+        "--threads", type=int, default=None, help="워커당 torch 스레드 수 (기본값: 코어 수 / 워커 수)"
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    args.threads = args.threads or max(1, cpu_count // args.workers)
+    _configure_logging(args.log_level)
+
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py 는 fork 를 지원하는 OS(Linux/macOS)에서만 실행할 수 있습니다.")
+
+    settings = get_settings()
+    if args.workers > 1 and not settings.DIARY_JOB_SQLITE_PATH:
+        # 일기 생성 작업 상태는 워커끼리 공유해야 어느 워커로 조회해도 결과를 찾을 수 있음
+        sys.exit("워커가 여러 개일 때는 DIARY_JOB_SQLITE_PATH 를 지정해야 합니다.")
+    # 워커의 get_diary_job_queue 가 워커 수를 확인할 수 있도록 전달
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+
+    sock = _bind_socket(args.host, args.port)
+    _preload(settings.EMOTION_BACKEND)
+
+    workers = {}  # pid -> fork 시각
+    for _ in range(args.workers):
+        workers[_spawn(sock, args)] = time.monotonic()
+    logger.info("Running %d workers on %s:%d (pids: %s)", args.workers, args.host, args.port, sorted(workers))
+
+    stopping = False
+    rapid_failures = 0
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    exit_code = 0
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid not in workers:
+            continue
+        uptime = time.monotonic() - workers.pop(pid)
+        if stopping:
+            continue
+        rapid_failures = rapid_failures + 1 if uptime < RAPID_EXIT_SECONDS else 0
+        if rapid_failures >= MAX_RAPID_FAILURES:
+            logger.error(
+                "Worker %d exited (%d); %d rapid failures in a row, shutting down", pid, status, rapid_failures
+            )
+            _stop(signal.SIGTERM, None)
+            exit_code = 1
+            continue
+        backoff = 0.0
+        if rapid_failures:
+            backoff = min(RESTART_BACKOFF_MAX_SECONDS, RESTART_BACKOFF_SECONDS * 2 ** (rapid_failures - 1))
+        # 비정상 종료된 워커는 이미 로딩된 모델을 가진 부모에서 다시 fork
+        logger.warning("Worker %d exited (%d), restarting in %.0fs", pid, status, backoff)
+        deadline = time.monotonic() + backoff
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if not stopping:
+            workers[_spawn(sock, args)] = time.monotonic()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
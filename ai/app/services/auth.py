@@ -1,30 +1,187 @@
 # https://ai.google.dev/gemini-api/docs/ephemeral-tokens?hl=ko#python 참고
 import datetime
+import logging
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Callable, NamedTuple
 
 from google import genai
 
+from core.config import get_settings
 
-def create_ephemeral_token(api_key: str) -> str:
-    now = datetime.datetime.now(tz=datetime.timezone.utc)
+logger = logging.getLogger("uvicorn.error")
+
+
+class EphemeralToken(NamedTuple):
+    name: str
+    new_session_expire_time: datetime.datetime
 
-    client = genai.Client(
+
+@lru_cache
+def get_genai_client(api_key: str) -> genai.Client:
+    """요청마다 Client(커넥션 풀)를 새로 만들지 않도록 프로세스에서 하나만 사용"""
+    return genai.Client(
         api_key=api_key,
         http_options={
             "api_version": "v1alpha",
         },
     )
 
-    auth_token = client.auth_tokens.create(
+
+def mint_ephemeral_token(
+    api_key: str, new_session_seconds: float = 60
+) -> EphemeralToken:
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    new_session_expire_time = now + datetime.timedelta(seconds=new_session_seconds)
+
+    auth_token = get_genai_client(api_key).auth_tokens.create(
         config={
             "uses": 1,  #  한 번만 세션 시작에 사용 가능
             "expire_time": now
             + datetime.timedelta(minutes=30),  # 30분 동안 세션 유지(대화) 가능
-            "new_session_expire_time": now
-            + datetime.timedelta(
-                minutes=1
-            ),  # 토큰을 발급받은 후 1분 이내에 세션을 시작해야 함
+            "new_session_expire_time": new_session_expire_time,  # 발급 후 이 시각 전에 세션을 시작해야 함
             "http_options": {"api_version": "v1alpha"},
         }
     )
 
-    return auth_token.name
+    return EphemeralToken(auth_token.name, new_session_expire_time)
+
+
+class EphemeralTokenPool:
+    """
+    ephemeral token 을 미리 발급해 두는 풀.
+    - 백그라운드 스레드가 풀을 size 개로 채움 (토큰을 꺼내 가면 바로 깨어나 보충)
+    - new_session_expire_time 까지 min_remaining_seconds 보다 적게 남은 토큰은 버림
+    - 마지막 요청 후 idle_seconds 가 지나면 보충하지 않음 (요청이 없는 워커가 토큰을 계속 발급하지 않도록)
+    - 풀이 비어 있으면 요청 스레드에서 바로 발급 (기존 동작)
+    """
+
+    def __init__(
+        self,
+        mint_fn: Callable[[], EphemeralToken],
+        size: int,
+        min_remaining_seconds: float,
+        idle_seconds: float = 300.0,
+        retry_seconds: float = 5.0,
+    ):
+        self._mint_fn = mint_fn
+        self.size = max(0, size)
+        self.min_remaining = datetime.timedelta(seconds=min_remaining_seconds)
+        self.idle_seconds = idle_seconds
+        self.retry_seconds = retry_seconds
+        self._last_take = time.monotonic()
+        self._tokens: deque[EphemeralToken] = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.counts = {"hits": 0, "misses": 0, "minted": 0, "evicted": 0, "errors": 0}
+
+    def start(self) -> None:
+        if self.size == 0:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            # 시작 직후 첫 요청을 위해 idle_seconds 동안은 채워 둠
+            self._last_take = time.monotonic()
+            self._thread = threading.Thread(
+                target=self._run, name="ephemeral-token-pool", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def take(self) -> str:
+        self._last_take = time.monotonic()
+        with self._lock:
+            self._evict_stale()
+            token = self._tokens.popleft() if self._tokens else None
+        if token is not None:
+            self.counts["hits"] += 1
+            self._wakeup.set()
+            return token.name
+        self.counts["misses"] += 1
+        self._wakeup.set()
+        return self._mint_fn().name
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._tokens),
+            "target": self.size,
+            "idle": self._idle(),
+            **self.counts,
+        }
+
+    def _idle(self) -> bool:
+        return time.monotonic() - self._last_take > self.idle_seconds
+
+    def _evict_stale(self) -> None:
+        deadline = datetime.datetime.now(tz=datetime.timezone.utc) + self.min_remaining
+        # 먼저 발급한 토큰이 먼저 만료되므로 앞에서부터 확인
+        while self._tokens and self._tokens[0].new_session_expire_time <= deadline:
+            self._tokens.popleft()
+            self.counts["evicted"] += 1
+
+    def _next_expiry_wait(self) -> float | None:
+        if not self._tokens:
+            return None
+        remaining = self._tokens[0].new_session_expire_time - self.min_remaining
+        return max(0.0, (remaining - datetime.datetime.now(tz=datetime.timezone.utc)).total_seconds())
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            with self._lock:
+                self._evict_stale()
+                missing = self.size - len(self._tokens)
+            if missing > 0 and not self._idle():
+                try:
+                    token = self._mint_fn()
+                except Exception as e:
+                    self.counts["errors"] += 1
+                    logger.warning("ephemeral token 미리 발급 실패: %s", e)
+                    self._stopped.wait(self.retry_seconds)
+                    continue
+                if token.new_session_expire_time - self.min_remaining <= datetime.datetime.now(
+                    tz=datetime.timezone.utc
+                ):
+                    # 발급 직후 이미 버릴 토큰이면 계속 발급하지 않도록 잠시 쉼
+                    self.counts["errors"] += 1
+                    logger.warning("발급한 ephemeral token 의 유효 시간이 너무 짧습니다.")
+                    self._stopped.wait(self.retry_seconds)
+                    continue
+                with self._lock:
+                    self._tokens.append(token)
+                self.counts["minted"] += 1
+                continue
+            # 풀이 가득 찼거나 요청이 없으면 가장 오래된 토큰이 만료될 때까지(또는 take 될 때까지) 대기.
+            # 요청이 없는 동안 남은 토큰은 만료되면 버리기만 하고, 풀이 비면 다음 take 까지 대기
+            with self._lock:
+                wait = self._next_expiry_wait()
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+
+@lru_cache
+def get_ephemeral_token_pool() -> EphemeralTokenPool:
+    settings = get_settings()
+    if settings.EPHEMERAL_TOKEN_MIN_REMAINING_SECONDS >= settings.EPHEMERAL_TOKEN_NEW_SESSION_SECONDS:
+        raise ValueError(
+            "EPHEMERAL_TOKEN_MIN_REMAINING_SECONDS 는 EPHEMERAL_TOKEN_NEW_SESSION_SECONDS 보다 작아야 합니다."
+        )
+    return EphemeralTokenPool(
+        lambda: mint_ephemeral_token(
+            settings.GEMINI_API_KEY, settings.EPHEMERAL_TOKEN_NEW_SESSION_SECONDS
+        ),
+        size=settings.EPHEMERAL_TOKEN_POOL_SIZE,
+        min_remaining_seconds=settings.EPHEMERAL_TOKEN_MIN_REMAINING_SECONDS,
+        idle_seconds=settings.EPHEMERAL_TOKEN_POOL_IDLE_SECONDS,
+    )
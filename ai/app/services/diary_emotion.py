@@ -1,6 +1,171 @@
-from models.model_def import predict_emotions
+import asyncio
+import base64
+from collections import deque
+from functools import lru_cache
+from typing import AsyncIterator
 
+import numpy as np
 
-def analyze_diary_emotion(content: str) -> list[str]:
-    emotion_list = predict_emotions(content)
-    return emotion_list
+from core.config import get_settings
+from models.model_def import EMOTION_LABELS, MODEL_VERSION, THRESHOLD, labels_from_probs
+from services.emotion_batcher import EmotionQueueFullError, get_emotion_batcher
+from services.result_cache import get_result_cache, make_cache_key
+
+
+@lru_cache
+def get_emotion_model_version() -> str:
+    """확률 값에 영향을 주는 설정까지 포함한 캐시 키 버전"""
+    settings = get_settings()
+    return ":".join(
+        [
+            MODEL_VERSION,
+            settings.EMOTION_BACKEND,
+            settings.EMOTION_PADDING,
+            "weighted" if settings.EMOTION_CHUNK_WEIGHTED else "mean",
+        ]
+    )
+
+
+def _lookup_cache(content: str, use_cache: bool):
+    """(캐시 키, 캐시된 확률 또는 None) 반환. use_cache=False면 조회하지 않음"""
+    cache = get_result_cache()
+    key = make_cache_key("emotion", get_emotion_model_version(), content)
+    if not use_cache:
+        cache.record_bypass(key)
+        return key, None
+    return key, cache.get(key)
+
+
+async def _lookup_cache_async(content: str, use_cache: bool):
+    """_lookup_cache 의 이벤트 루프용 버전 (디스크 캐시 조회가 루프를 막지 않음)"""
+    cache = get_result_cache()
+    key = make_cache_key("emotion", get_emotion_model_version(), content)
+    if not use_cache:
+        cache.record_bypass(key)
+        return key, None
+    return key, await cache.get_async(key)
+
+
+def get_emotion_probabilities(content: str, use_cache: bool = True) -> list[float]:
+    key, cached = _lookup_cache(content, use_cache)
+    if cached is not None:
+        return cached
+    probs = [float(p) for p in get_emotion_batcher().submit(content).result()]
+    get_result_cache().set(key, probs)
+    return probs
+
+
+async def get_emotion_probabilities_async(content: str, use_cache: bool = True) -> list[float]:
+    key, cached = await _lookup_cache_async(content, use_cache)
+    if cached is not None:
+        return cached
+    probs = await asyncio.wrap_future(get_emotion_batcher().submit(content))
+    probs = [float(p) for p in probs]
+    get_result_cache().set(key, probs)
+    return probs
+
+
+def analyze_diary_emotion(content: str, use_cache: bool = True) -> list[str]:
+    return labels_from_probs(get_emotion_probabilities(content, use_cache), THRESHOLD)
+
+
+async def analyze_diary_emotion_async(content: str, use_cache: bool = True) -> list[str]:
+    probs = await get_emotion_probabilities_async(content, use_cache)
+    return labels_from_probs(probs, THRESHOLD)
+
+
+def format_emotion_result(
+    probs: list[float],
+    threshold: float | None = None,
+    top_k: int | None = None,
+    probabilities: str = "none",
+    precision: int = 4,
+) -> dict:
+    """
+    캐시/모델에서 얻은 확률 벡터로 응답 생성 (다시 추론하지 않음).
+    - threshold: 요청별 라벨 기준값 (기본값: THRESHOLD)
+    - top_k: 확률이 높은 순서로 k개 라벨과 확률
+    - probabilities: "rounded"면 라벨별 확률(소수점 precision 자리),
+      "float16"이면 EMOTION_LABELS 순서의 little-endian float16 배열을 base64로
+    """
+    result = {
+        "emotionList": labels_from_probs(probs, THRESHOLD if threshold is None else threshold)
+    }
+    if top_k:
+        order = sorted(range(len(probs)), key=probs.__getitem__, reverse=True)[:top_k]
+        result["topEmotions"] = [
+            {"label": EMOTION_LABELS[i], "probability": round(probs[i], precision)} for i in order
+        ]
+    if probabilities == "rounded":
+        result["probabilities"] = {
+            label: round(p, precision) for label, p in zip(EMOTION_LABELS, probs)
+        }
+    elif probabilities == "float16":
+        packed = np.asarray(probs, dtype="<f2").tobytes()
+        result["probabilitiesFloat16"] = base64.b64encode(packed).decode("ascii")
+    return result
+
+
+def bulk_concurrency() -> int:
+    """
+    bulk 요청 전체(프로세스 단위)가 동시에 배치 스케줄러에 넣을 수 있는 일기 수.
+    대기열의 절반을 넘지 않게 해서 backfill 중에도 단건 요청이 대기열 가득 참(503)을 겪지 않게 함.
+    """
+    settings = get_settings()
+    return max(1, min(settings.EMOTION_BULK_CONCURRENCY, settings.EMOTION_QUEUE_MAX_SIZE // 2))
+
+
+@lru_cache
+def _bulk_slots() -> asyncio.Semaphore:
+    return asyncio.Semaphore(bulk_concurrency())
+
+
+async def _bulk_probabilities(content: str, use_cache: bool) -> list[float]:
+    """
+    bulk 용 확률 조회: 대기열이 가득 차면 실패로 돌려주지 않고 지수 백오프로 기다렸다가 다시 넣음.
+    EMOTION_BULK_RETRY_TIMEOUT_SECONDS 동안 자리가 나지 않으면 EmotionQueueFullError.
+    """
+    deadline = asyncio.get_running_loop().time() + get_settings().EMOTION_BULK_RETRY_TIMEOUT_SECONDS
+    delay = 0.05
+    async with _bulk_slots():
+        while True:
+            try:
+                return await get_emotion_probabilities_async(content, use_cache)
+            except EmotionQueueFullError:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    raise
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, 1.0)
+
+
+async def iter_emotion_probabilities(
+    contents: list[str], use_cache: bool = True, concurrency: int | None = None
+) -> AsyncIterator[tuple[int, list[float] | Exception]]:
+    """
+    여러 일기의 확률을 입력 순서대로 (index, 확률 또는 예외) 로 반환.
+    최대 concurrency 개(기본값: bulk_concurrency())를 동시에 배치 스케줄러에 넣어 한 번의 forward로 묶이게 함.
+    동시에 들어온 bulk 요청끼리도 bulk_concurrency() 개의 자리를 나눠 씀.
+    """
+    concurrency = concurrency or bulk_concurrency()
+    pending: deque[tuple[int, asyncio.Task]] = deque()
+    try:
+        for index, content in enumerate(contents):
+            task = asyncio.create_task(_bulk_probabilities(content, use_cache))
+            pending.append((index, task))
+            if len(pending) >= concurrency:
+                yield await _next_result(pending)
+        while pending:
+            yield await _next_result(pending)
+    finally:
+        # 클라이언트가 연결을 끊으면 남은 작업 취소
+        for _, task in pending:
+            task.cancel()
+
+
+async def _next_result(pending: deque) -> tuple[int, list[float] | Exception]:
+    index, task = pending.popleft()
+    try:
+        return index, await task
+    except Exception as e:
+        return index, e
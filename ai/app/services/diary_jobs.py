@@ -0,0 +1,512 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import httpx
+
+from core.config import get_settings
+from services.diary_emotion import analyze_diary_emotion_async, get_emotion_model_version
+from services.gpt_diary_summary import PROMPT_VERSION, generate_diary_from_dialogue
+from services.result_cache import make_cache_key
+
+logger = logging.getLogger("uvicorn.error")
+
+UNFINISHED = ("queued", "running")
+# 작업을 가진 프로세스가 살아 있는지: heartbeat 가 STALE_AFTER_SECONDS 넘게 멈춘 미완료 작업은 고아로 보고 실패 처리
+HEARTBEAT_SECONDS = 10
+STALE_AFTER_SECONDS = 30
+
+
+class DiaryJobQueueFullError(RuntimeError):
+    """일기 생성 작업 대기열이 가득 차서 작업을 받을 수 없을 때 발생"""
+
+
+class InvalidCallbackUrlError(ValueError):
+    """callbackUrl 이 허용되지 않는 주소일 때 발생"""
+
+
+async def validate_callback_url(url: str, allowed_hosts: list[str]) -> None:
+    """
+    webhook 주소 검사 (대화 내용이 담긴 결과를 내부망/임의 서버로 보내지 않도록).
+    - allowed_hosts 가 있으면 목록에 있는 호스트만 허용
+    - 없으면 https 이면서 DNS 조회 결과가 모두 공인 IP 인 주소만 허용 (loopback, 사설망, link-local 등 거부)
+    """
+    parsed = urlsplit(url)
+    host = (parsed.hostname or "").lower()
+    if parsed.scheme not in ("http", "https") or not host:
+        raise InvalidCallbackUrlError("callbackUrl 은 http(s) 주소여야 합니다.")
+    if allowed_hosts:
+        if host not in {h.lower() for h in allowed_hosts}:
+            raise InvalidCallbackUrlError(f"허용되지 않은 callbackUrl 호스트입니다: {host}")
+        return
+    if parsed.scheme != "https":
+        raise InvalidCallbackUrlError("callbackUrl 은 https 주소여야 합니다.")
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, parsed.port or 443, type=socket.SOCK_STREAM
+        )
+    except (socket.gaierror, UnicodeError) as e:
+        raise InvalidCallbackUrlError(f"callbackUrl 호스트를 찾을 수 없습니다: {host}") from e
+    for *_, sockaddr in infos:
+        ip = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise InvalidCallbackUrlError(f"내부망 주소로는 callbackUrl 을 보낼 수 없습니다: {host}")
+
+
+class DiaryJobStore:
+    """
+    작업 상태/결과 저장소 (SQLite).
+    path 가 파일이면 같은 서버의 워커 프로세스끼리 공유되어 어느 워커로 조회해도 같은 결과를 받음.
+    기본값(:memory:)은 프로세스 안에서만 유효하므로 단일 워커에서만 사용.
+    - 완료/실패한 작업만 max_jobs 를 넘으면 오래된 것부터 지움 (대기/실행 중인 작업은 지우지 않음)
+    - 모든 작업은 생성(완료) 후 ttl_seconds 가 지나면 삭제
+    - 미완료 작업에는 실행하는 프로세스(owner)와 heartbeat 를 기록해, 프로세스가 죽어 멈춘 작업은
+      중복 제거 대상에서 빼고 다른 프로세스가 실패로 정리함
+    """
+
+    def __init__(
+        self, path: str, max_jobs: int, ttl_seconds: float, stale_after: float = STALE_AFTER_SECONDS
+    ):
+        self.path = path
+        self.max_jobs = max_jobs
+        self.ttl = ttl_seconds
+        self.stale_after = stale_after
+        # pid 는 재시작 후 재사용될 수 있으므로 프로세스(저장소)마다 새로 만든 ID 를 함께 기록
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        # 트랜잭션은 _transaction 에서 직접 시작 (다른 워커와의 동시 쓰기는 BEGIN IMMEDIATE 로 직렬화)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS diary_jobs ("
+            "job_id TEXT PRIMARY KEY, input_key TEXT NOT NULL, status TEXT NOT NULL, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, expires_at REAL NOT NULL, "
+            "result TEXT, callbacks TEXT NOT NULL DEFAULT '[]', owner TEXT, heartbeat_at REAL);"
+            "CREATE INDEX IF NOT EXISTS diary_jobs_input ON diary_jobs (input_key, created_at);"
+            "CREATE INDEX IF NOT EXISTS diary_jobs_expires ON diary_jobs (expires_at);"
+            "CREATE TABLE IF NOT EXISTS diary_sessions ("
+            "session_id TEXT PRIMARY KEY, job_id TEXT NOT NULL);"
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(diary_jobs)")}
+        for column, type_ in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+            if column not in columns:  # 이전 버전에서 만든 파일
+                self._conn.execute(f"ALTER TABLE diary_jobs ADD COLUMN {column} {type_}")
+
+    @property
+    def shared(self) -> bool:
+        return self.path != ":memory:"
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> dict:
+        job = {"jobId": row["job_id"], "status": row["status"], "createdAt": row["created_at"]}
+        if row["started_at"] is not None:
+            job["startedAt"] = row["started_at"]
+        if row["finished_at"] is not None:
+            job["finishedAt"] = row["finished_at"]
+        if row["result"]:
+            job.update(json.loads(row["result"]))
+        return job
+
+    def submit(
+        self,
+        input_key: str,
+        callback_url: str | None,
+        session_id: str | None,
+        accept_new: bool,
+    ) -> tuple[dict | None, bool, bool]:
+        """
+        같은 입력으로 실패하지 않은 작업이 있으면 재사용, 없으면 accept_new 일 때만 새로 만듦.
+        반환: (작업 또는 거부 시 None, 새로 만들었는지, callbackUrl 로 바로 결과를 보내야 하는지)
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            # heartbeat 가 끊긴 미완료 작업(고아)은 끝나지 않으므로 재사용하지 않음
+            row = conn.execute(
+                "SELECT * FROM diary_jobs WHERE input_key = ? AND expires_at >= ? "
+                "AND (status = 'done' OR (status IN (?, ?) AND heartbeat_at >= ?)) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (input_key, now, *UNFINISHED, now - self.stale_after),
+            ).fetchone()
+            created = notify = False
+            if row is not None:
+                job_id = row["job_id"]
+                if callback_url and row["status"] == "done":
+                    notify = True
+                elif callback_url:
+                    callbacks = json.loads(row["callbacks"]) + [callback_url]
+                    conn.execute(
+                        "UPDATE diary_jobs SET callbacks = ? WHERE job_id = ?",
+                        (json.dumps(callbacks), job_id),
+                    )
+            elif accept_new:
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO diary_jobs "
+                    "(job_id, input_key, status, created_at, expires_at, callbacks, owner, heartbeat_at) "
+                    "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                    (
+                        job_id,
+                        input_key,
+                        now,
+                        now + self.ttl,
+                        json.dumps([callback_url] if callback_url else []),
+                        self.owner,
+                        now,
+                    ),
+                )
+                created = True
+            else:
+                return None, False, False
+            if session_id:
+                conn.execute(
+                    "INSERT OR REPLACE INTO diary_sessions (session_id, job_id) VALUES (?, ?)",
+                    (session_id, job_id),
+                )
+            row = conn.execute("SELECT * FROM diary_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_job(row), created, notify
+
+    def mark_running(self, job_id: str) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE diary_jobs SET status = 'running', started_at = ?, heartbeat_at = ? WHERE job_id = ?",
+                (now, now, job_id),
+            )
+
+    def finish(self, job_id: str, status: str, result: dict) -> tuple[dict | None, list[str]]:
+        """작업 결과를 저장하고 (작업, 보내야 할 callbackUrl 목록) 반환"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE diary_jobs SET status = ?, finished_at = ?, expires_at = ?, result = ? "
+                "WHERE job_id = ?",
+                (status, now, now + self.ttl, json.dumps(result, ensure_ascii=False), job_id),
+            )
+            row = conn.execute("SELECT * FROM diary_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE diary_jobs SET callbacks = '[]' WHERE job_id = ?", (job_id,))
+            self._prune(conn, now)
+        if row is None:
+            return None, []
+        return self._to_job(row), json.loads(row["callbacks"])
+
+    def heartbeat(self) -> None:
+        """이 프로세스가 가진 미완료 작업이 아직 실행 중임을 기록"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE diary_jobs SET heartbeat_at = ? WHERE owner = ? AND status IN (?, ?)",
+                (time.time(), self.owner, *UNFINISHED),
+            )
+
+    def fail_unfinished(self, error: str, stale_only: bool) -> list[tuple[dict, list[str]]]:
+        """
+        미완료 작업을 실패로 바꾸고 [(작업, 보내야 할 callbackUrl 목록)] 반환.
+        stale_only=True: 다른 프로세스가 죽어 heartbeat 가 끊긴 작업, False: 이 프로세스가 가진 작업 (종료 시)
+        """
+        now = time.time()
+        if stale_only:
+            where, params = "heartbeat_at IS NULL OR heartbeat_at < ?", (now - self.stale_after,)
+        else:
+            where, params = "owner = ?", (self.owner,)
+        with self._transaction() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM diary_jobs WHERE status IN (?, ?) AND ({where})", (*UNFINISHED, *params)
+            ).fetchall()
+            result = json.dumps({"error": error}, ensure_ascii=False)
+            conn.executemany(
+                "UPDATE diary_jobs SET status = 'failed', finished_at = ?, expires_at = ?, result = ?, "
+                "callbacks = '[]' WHERE job_id = ?",
+                [(now, now + self.ttl, result, row["job_id"]) for row in rows],
+            )
+        failed = []
+        for row in rows:
+            job = self._to_job(row)
+            job.update(status="failed", finishedAt=now, error=error)
+            failed.append((job, json.loads(row["callbacks"])))
+        return failed
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM diary_jobs WHERE job_id = ? AND expires_at >= ?", (job_id, time.time())
+            ).fetchone()
+        return self._to_job(row) if row is not None else None
+
+    def get_by_session(self, session_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT diary_jobs.* FROM diary_sessions JOIN diary_jobs USING (job_id) "
+                "WHERE session_id = ? AND expires_at >= ?",
+                (session_id, time.time()),
+            ).fetchone()
+        return self._to_job(row) if row is not None else None
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM diary_jobs WHERE expires_at < ?", (now,))
+        conn.execute(
+            "DELETE FROM diary_jobs WHERE job_id IN ("
+            "SELECT job_id FROM diary_jobs WHERE status NOT IN (?, ?) "
+            "ORDER BY finished_at DESC LIMIT -1 OFFSET ?)",
+            (*UNFINISHED, self.max_jobs),
+        )
+        conn.execute("DELETE FROM diary_sessions WHERE job_id NOT IN (SELECT job_id FROM diary_jobs)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class DiaryJobQueue:
+    """
+    일기 요약(GPT) -> 감정 분석(BERT)을 한 작업으로 묶어 백그라운드 워커 풀에서 실행.
+    - 요청은 작업 ID만 받고 바로 반환 (HTTP 요청이 GPT 호출 시간 동안 붙잡히지 않음)
+    - 같은 대화(정규화 후 해시)로 진행 중이거나 끝난 작업이 있으면 그 작업을 재사용
+    - 완료/실패 시 callbackUrl 로 작업 결과를 POST (webhook)
+    작업 실행은 요청을 받은 프로세스에서 하고, 상태/결과는 DiaryJobStore 에 저장 (SQLite 호출은 스레드에서 실행).
+    """
+
+    def __init__(
+        self,
+        store: DiaryJobStore,
+        workers: int,
+        max_queue_size: int,
+        callback_timeout: float,
+        callback_retries: int,
+        callback_allowed_hosts: list[str] | None = None,
+        heartbeat_seconds: float = HEARTBEAT_SECONDS,
+    ):
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_queue_size = max_queue_size
+        self.callback_timeout = callback_timeout
+        self.callback_retries = max(1, callback_retries)
+        self.callback_allowed_hosts = list(callback_allowed_hosts or [])
+        self.heartbeat_seconds = heartbeat_seconds
+        # 크기 제한은 _pending 으로 직접 관리 (저장소 조회를 await 하는 동안 자리를 미리 잡아 둠)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pending = 0
+        self._worker_tasks: list[asyncio.Task] = []
+        self._heartbeat_task: asyncio.Task | None = None
+        self._callback_tasks: set[asyncio.Task] = set()
+        self._http: httpx.AsyncClient | None = None
+        self.running = 0
+        self.counts = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "rejected": 0,
+            "done": 0,
+            "failed": 0,
+            "orphaned": 0,
+        }
+
+    def start(self) -> None:
+        if self._worker_tasks:
+            return
+        self._http = httpx.AsyncClient(timeout=self.callback_timeout, follow_redirects=False)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self) -> None:
+        tasks = self._worker_tasks + ([self._heartbeat_task] if self._heartbeat_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, *self._callback_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._heartbeat_task = None
+        # 실행 중이던 작업과 아직 대기열에 있던 작업은 이 프로세스가 끝나면 완료되지 않으므로 실패로 기록
+        # (그대로 두면 다시 요청해도 끝나지 않을 작업이 중복 제거로 반환됨)
+        failed = await asyncio.to_thread(
+            self.store.fail_unfinished, "서버가 종료되어 작업이 중단되었습니다.", stale_only=False
+        )
+        if failed:
+            logger.warning("종료로 중단된 일기 생성 작업 %d건을 실패로 기록", len(failed))
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+        self._pending = 0
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self.store.close()
+
+    async def submit(
+        self, raw_script: str, callback_url: str | None = None, session_id: str | None = None
+    ) -> dict:
+        if callback_url:
+            await validate_callback_url(callback_url, self.callback_allowed_hosts)
+        input_key = make_cache_key(
+            "diaryjob", f"{PROMPT_VERSION}:{get_emotion_model_version()}", raw_script
+        )
+        reserved = self._pending < self.max_queue_size
+        if reserved:
+            self._pending += 1
+        try:
+            job, created, notify = await asyncio.to_thread(
+                self.store.submit, input_key, callback_url, session_id, reserved
+            )
+        except BaseException:
+            if reserved:
+                self._pending -= 1
+            raise
+        if not created and reserved:
+            self._pending -= 1
+        if job is None:
+            self.counts["rejected"] += 1
+            raise DiaryJobQueueFullError(
+                f"일기 생성 대기열이 가득 찼습니다 (최대 {self.max_queue_size}건)"
+            )
+        if created:
+            self.counts["submitted"] += 1
+            self._queue.put_nowait((job["jobId"], raw_script))
+        else:
+            self.counts["deduplicated"] += 1
+            if notify:
+                self._schedule_callback(job, [callback_url])
+        return job
+
+    async def submit_session(self, session_id: str, raw_script: str) -> dict:
+        """proxy 가 넘겨준 통화 대화록: 세션 ID 로도 작업을 조회할 수 있게 연결"""
+        return await self.submit(raw_script, session_id=session_id)
+
+    async def get(self, job_id: str) -> dict | None:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def get_by_session(self, session_id: str) -> dict | None:
+        return await asyncio.to_thread(self.store.get_by_session, session_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, raw_script = await self._queue.get()
+            self._pending -= 1
+            self.running += 1
+            try:
+                await asyncio.to_thread(self.store.mark_running, job_id)
+                diary = await generate_diary_from_dialogue(raw_script)
+                emotion_list = await analyze_diary_emotion_async(diary.get("content", ""))
+                status = "done"
+                result = {
+                    "title": diary.get("title"),
+                    "content": diary.get("content"),
+                    "emotionList": emotion_list,
+                }
+            except asyncio.CancelledError:
+                # 종료 시 취소: 이 작업과 대기열에 남은 작업은 stop() 이 한 번에 실패로 기록
+                raise
+            except Exception as e:
+                logger.exception("일기 생성 작업 실패 (jobId=%s)", job_id)
+                status, result = "failed", {"error": str(e)}
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+            self.counts[status] += 1
+            try:
+                job, callbacks = await asyncio.to_thread(self.store.finish, job_id, status, result)
+            except Exception:
+                logger.exception("일기 생성 작업 결과 저장 실패 (jobId=%s)", job_id)
+                continue
+            if job is not None and callbacks:
+                self._schedule_callback(job, callbacks)
+
+    async def _heartbeat(self) -> None:
+        """
+        HEARTBEAT_SECONDS 마다 이 프로세스의 미완료 작업 heartbeat 를 갱신하고,
+        다른 프로세스가 죽어 heartbeat 가 끊긴 작업은 실패로 바꾼 뒤 callbackUrl 로 알림.
+        """
+        while True:
+            try:
+                await asyncio.to_thread(self.store.heartbeat)
+                orphans = await asyncio.to_thread(
+                    self.store.fail_unfinished,
+                    "작업을 실행하던 워커가 종료되어 작업이 중단되었습니다.",
+                    stale_only=True,
+                )
+            except Exception:
+                logger.exception("일기 생성 작업 heartbeat 실패")
+                orphans = []
+            for job, callbacks in orphans:
+                logger.warning("중단된 일기 생성 작업을 실패로 기록 (jobId=%s)", job["jobId"])
+                self.counts["orphaned"] += 1
+                if callbacks:
+                    self._schedule_callback(job, callbacks)
+            await asyncio.sleep(self.heartbeat_seconds)
+
+    def _schedule_callback(self, job: dict, urls: list[str]) -> None:
+        task = asyncio.create_task(self._notify(dict(job), urls))
+        self._callback_tasks.add(task)
+        task.add_done_callback(self._callback_tasks.discard)
+
+    async def _notify(self, job: dict, urls: list[str]) -> None:
+        for url in urls:
+            for attempt in range(self.callback_retries):
+                try:
+                    # 접수 후 DNS 가 내부망 주소로 바뀌었을 수 있으므로 보낼 때마다 다시 검사
+                    await validate_callback_url(url, self.callback_allowed_hosts)
+                    response = await self._http.post(url, json=job)
+                    response.raise_for_status()
+                    break
+                except InvalidCallbackUrlError as e:
+                    logger.warning("webhook 전송 거부 (jobId=%s, url=%s): %s", job["jobId"], url, e)
+                    break
+                except httpx.HTTPError as e:
+                    if attempt + 1 == self.callback_retries:
+                        logger.warning("webhook 전송 실패 (jobId=%s, url=%s): %s", job["jobId"], url, e)
+                    else:
+                        await asyncio.sleep(2**attempt)
+
+    def stats(self) -> dict:
+        return {
+            "queueDepth": self._pending,
+            "queueMaxSize": self.max_queue_size,
+            "workers": self.workers,
+            "running": self.running,
+            "sharedStore": self.store.shared,
+            **self.counts,
+        }
+
+
+def worker_count() -> int:
+    """serve.py / uvicorn --workers 가 쓰는 WEB_CONCURRENCY 기준 워커 프로세스 수"""
+    return int(os.getenv("WEB_CONCURRENCY", 1))
+
+
+@lru_cache
+def get_diary_job_queue() -> DiaryJobQueue:
+    settings = get_settings()
+    path = settings.DIARY_JOB_SQLITE_PATH
+    if path is None and worker_count() > 1:
+        # 프로세스마다 따로 저장하면 작업을 만든 워커가 아닌 다른 워커에서 조회 시 404 가 나므로 시작하지 않음
+        raise ValueError(
+            "워커가 여러 개일 때는 DIARY_JOB_SQLITE_PATH 로 워커끼리 공유할 작업 저장소를 지정해야 합니다."
+        )
+    return DiaryJobQueue(
+        DiaryJobStore(path or ":memory:", settings.DIARY_JOB_MAX_JOBS, settings.DIARY_JOB_TTL_SECONDS),
+        workers=settings.DIARY_JOB_WORKERS,
+        max_queue_size=settings.DIARY_JOB_QUEUE_MAX_SIZE,
+        callback_timeout=settings.DIARY_JOB_CALLBACK_TIMEOUT_SECONDS,
+        callback_retries=settings.DIARY_JOB_CALLBACK_RETRIES,
+        callback_allowed_hosts=settings.DIARY_JOB_CALLBACK_ALLOWED_HOSTS,
+    )
@@ -0,0 +1,187 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache, partial
+from typing import Callable
+
+from core.config import get_settings
+from models.model_def import predict_probabilities_batch
+
+
+class EmotionQueueFullError(RuntimeError):
+    """배치 대기열이 가득 차서 요청을 받을 수 없을 때 발생"""
+
+
+class EmotionBatcherStoppedError(RuntimeError):
+    """배치 스케줄러가 종료된 뒤 들어왔거나, 종료 시점까지 처리되지 못한 요청에 설정됨"""
+
+
+class Histogram:
+    """2의 거듭제곱 경계를 가지는 간단한 누적 히스토그램"""
+
+    def __init__(self, bounds: list[int]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0
+
+    def observe(self, value: int) -> None:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        buckets = {f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            "count": self.total,
+            "mean": self.sum / self.total if self.total else 0.0,
+            "buckets": buckets,
+        }
+
+
+def _power_of_two_bounds(limit: int) -> list[int]:
+    bounds = [1]
+    while bounds[-1] < limit:
+        bounds.append(bounds[-1] * 2)
+    return bounds
+
+
+class EmotionBatcher:
+    """
+    감정 분석 요청을 짧은 시간(window) 동안 모았다가 한 번의 forward로 처리하는 배치 스케줄러.
+    - 첫 요청이 들어온 뒤 max_wait_ms 가 지나거나 max_batch_size 만큼 모이면 배치 실행
+    - 각 요청은 Future로 자신의 확률 벡터를 돌려받음
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[list[str]], list],
+        max_batch_size: int,
+        max_wait_ms: float,
+        max_queue_size: int,
+    ):
+        self._predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        self.batch_sizes = Histogram(_power_of_two_bounds(self.max_batch_size))
+        self.queue_depths = Histogram(_power_of_two_bounds(max(1, max_queue_size)))
+        self.rejected = 0
+
+    def start(self) -> None:
+        with self._lock:
+            self._stopped.clear()
+            self._ensure_thread()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        # lock 안에서 stopped 를 세워 이후 submit 이 대기열에 넣지 못하게 함
+        with self._lock:
+            self._stopped.set()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+        # 스레드가 가져가지 못한 요청은 await 중인 쪽이 멈추지 않도록 실패 처리
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(EmotionBatcherStoppedError("emotion batcher stopped"))
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._stopped.is_set():
+                raise EmotionBatcherStoppedError("emotion batcher stopped")
+            self._ensure_thread()
+            try:
+                self._queue.put_nowait((text, future))
+            except queue.Full:
+                self.rejected += 1
+                raise EmotionQueueFullError("감정 분석 대기열이 가득 찼습니다.")
+        return future
+
+    def stats(self) -> dict:
+        return {
+            "queueDepth": self._queue.qsize(),
+            "rejected": self.rejected,
+            "maxBatchSize": self.max_batch_size,
+            "maxWaitMs": self.max_wait * 1000,
+            "batchSize": self.batch_sizes.snapshot(),
+            "queueDepthAtDispatch": self.queue_depths.snapshot(),
+        }
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="emotion-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def _collect(self) -> list:
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            # 클라이언트가 이미 취소한 요청은 건너뜀
+            batch = [(text, f) for text, f in batch if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            self.queue_depths.observe(self._queue.qsize())
+            self.batch_sizes.observe(len(batch))
+            try:
+                probs = self._predict_fn([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), p in zip(batch, probs):
+                future.set_result(p)
+
+
+@lru_cache
+def get_emotion_batcher() -> EmotionBatcher:
+    settings = get_settings()
+    return EmotionBatcher(
+        partial(
+            predict_probabilities_batch,
+            padding=settings.EMOTION_PADDING,
+            max_batch_size=settings.EMOTION_FORWARD_BATCH_SIZE,
+            weighted=settings.EMOTION_CHUNK_WEIGHTED,
+            backend=settings.EMOTION_BACKEND,
+        ),
+        max_batch_size=settings.EMOTION_BATCH_MAX_SIZE,
+        max_wait_ms=settings.EMOTION_BATCH_WINDOW_MS,
+        max_queue_size=settings.EMOTION_QUEUE_MAX_SIZE,
+    )
@@ -1,17 +1,36 @@
+import asyncio
+import hashlib
 import json
+import re
+from typing import AsyncIterator
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 
 from core.config import get_settings
+from services.result_cache import get_result_cache, make_cache_key
 
 settings = get_settings()
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# 요청마다 새로 만들지 않고 커넥션 풀을 공유하는 비동기 클라이언트
+# (재시도는 openai SDK의 지수 백오프 사용)
+client = AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    timeout=settings.OPENAI_TIMEOUT_SECONDS,
+    max_retries=settings.OPENAI_MAX_RETRIES,
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS,
+        )
+    ),
+)
+# 동시에 진행 중인 GPT 호출 수 제한
+_concurrency = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
 
+GPT_MODEL = "gpt-4"
+TEMPERATURE = 0.7
 
-def generate_diary_from_dialogue(raw_script: str) -> dict:
-    dialogue_text = raw_script.strip()
-
-    prompt = f"""
+PROMPT_TEMPLATE = """
 너는 사용자와 AI가 나눈 대화를 바탕으로, '일기 제목'과 '일기 내용'을 작성하는 작가야.
 
 아래는 하루 동안 사용자와 AI가 나눈 실제 대화야. 이 대화의 흐름, 분위기를 전체적으로 고려해서 하루 일기를 작성해줘.
@@ -50,10 +69,169 @@ def generate_diary_from_dialogue(raw_script: str) -> dict:
 \"\"\"{dialogue_text}\"\"\"
 """
 
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7,
-    )
+# 프롬프트/모델/temperature가 바뀌면 캐시 키도 바뀌도록 버전에 포함
+PROMPT_VERSION = hashlib.sha256(
+    f"{GPT_MODEL}\0{TEMPERATURE}\0{PROMPT_TEMPLATE}".encode("utf-8")
+).hexdigest()[:16]
+
+
+class _JsonFieldStreamer:
+    """
+    스트리밍으로 들어오는 JSON 응답 조각에서 "title", "content" 문자열 값을 증분으로 추출.
+    feed()는 새로 확정된 (필드명, 텍스트 조각) 목록을 반환.
+    """
+
+    _KEY_PATTERN = re.compile(r'"(title|content)"\s*:\s*"')
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._field = None
+
+    def feed(self, delta: str) -> list[tuple[str, str]]:
+        self._buffer += delta
+        events = []
+        while True:
+            if self._field is None:
+                match = self._KEY_PATTERN.search(self._buffer, self._pos)
+                if match is None:
+                    return events
+                self._field = match.group(1)
+                self._pos = match.end()
+                continue
+            text, finished = self._read_string()
+            if text:
+                events.append((self._field, text))
+            if not finished:
+                return events
+            self._field = None
+
+    def _read_string(self) -> tuple[str, bool]:
+        """현재 위치부터 문자열 값을 읽음. (디코딩된 텍스트, 닫는 따옴표까지 읽었는지)"""
+        out = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self._pos = i + 1
+                return "".join(out), True
+            if char != "\\":
+                out.append(char)
+                i += 1
+                continue
+            # 이스케이프: \uXXXX(서로게이트 쌍이면 \uXXXX\uXXXX)까지 모두 도착해야 디코딩
+            if i + 1 >= len(buffer):
+                break
+            length = 2
+            if buffer[i + 1] == "u":
+                length = 6
+                if i + 6 <= len(buffer) and 0xD800 <= int(buffer[i + 2:i + 6], 16) <= 0xDBFF:
+                    length = 12
+            if i + length > len(buffer):
+                break
+            out.append(json.loads(f'"{buffer[i:i + length]}"'))
+            i += length
+        self._pos = i
+        return "".join(out), False
+
+
+def _build_messages(dialogue_text: str) -> list[dict]:
+    return [{"role": "user", "content": PROMPT_TEMPLATE.format(dialogue_text=dialogue_text)}]
+
+
+async def generate_diary_from_dialogue(raw_script: str, use_cache: bool = True) -> dict:
+    dialogue_text = raw_script.strip()
+
+    cache = get_result_cache()
+    key = make_cache_key("summary", PROMPT_VERSION, dialogue_text)
+    if use_cache:
+        cached = await cache.get_async(key)
+        if cached is not None:
+            return cached
+    else:
+        cache.record_bypass(key)
+
+    async with _concurrency:
+        response = await client.chat.completions.create(
+            model=GPT_MODEL,
+            messages=_build_messages(dialogue_text),
+            temperature=TEMPERATURE,
+        )
+
+    result = json.loads(response.choices[0].message.content)
+    cache.set(key, result)
+    return result
+
+
+async def stream_diary_from_dialogue(
+    raw_script: str, use_cache: bool = True
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    일기 생성 결과를 (이벤트명, 데이터) 형태로 스트리밍.
+    - ("title" | "content", {"delta": ...}): 토큰이 도착하는 대로 전송
+    - ("done", {"title": ..., "content": ...}): 전체 결과 (캐시에 저장됨)
+    캐시 적중 시 title/content 를 한 번에 보내고 done 으로 종료.
+    """
+    dialogue_text = raw_script.strip()
+
+    cache = get_result_cache()
+    key = make_cache_key("summary", PROMPT_VERSION, dialogue_text)
+    if use_cache:
+        cached = await cache.get_async(key)
+        if cached is not None:
+            for field in ("title", "content"):
+                yield field, {"delta": cached.get(field, "")}
+            yield "done", cached
+            return
+    else:
+        cache.record_bypass(key)
+
+    # upstream 은 별도 태스크가 끝까지 읽어 대기열에 넣고 바로 _concurrency 자리를 반납함
+    # (느린 SSE 클라이언트가 OpenAI 동시 호출 자리를 붙잡고 있지 않도록 소비와 분리)
+    events: asyncio.Queue = asyncio.Queue()
+    reader = asyncio.create_task(_read_stream(dialogue_text, key, events))
+    try:
+        while True:
+            item = await events.get()
+            if isinstance(item, Exception):
+                raise item
+            yield item
+            if item[0] == "done":
+                return
+    finally:
+        # 클라이언트가 연결을 끊으면 upstream 읽기도 중단 (이미 끝났으면 아무 일도 없음)
+        reader.cancel()
+
+
+async def _read_stream(dialogue_text: str, key: str, events: asyncio.Queue) -> None:
+    """GPT 스트리밍 응답을 끝까지 읽어 (이벤트명, 데이터) 를 events 에 넣음. 실패하면 예외를 넣음"""
+    streamer = _JsonFieldStreamer()
+    raw = []
+    try:
+        async with _concurrency:
+            stream = await client.chat.completions.create(
+                model=GPT_MODEL,
+                messages=_build_messages(dialogue_text),
+                temperature=TEMPERATURE,
+                stream=True,
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                raw.append(delta)
+                for field, text in streamer.feed(delta):
+                    events.put_nowait((field, {"delta": text}))
+        result = json.loads("".join(raw))
+    except Exception as e:
+        events.put_nowait(e)
+        return
+    get_result_cache().set(key, result)
+    events.put_nowait(("done", result))
+
 
-    return json.loads(response.choices[0].message.content)
+async def close_client() -> None:
+    await client.close()
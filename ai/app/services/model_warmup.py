@@ -0,0 +1,72 @@
+import logging
+import time
+
+from kss import split_sentences
+
+from core.config import get_settings
+from models.model_def import get_model, get_tokenizer, predict_probabilities_batch
+
+logger = logging.getLogger("uvicorn.error")
+
+# 워밍업용 더미 일기 (짧은 입력 단건 + 길이가 다른 입력 배치)
+_WARMUP_SHORT = "오늘은 평범한 하루였다."
+_WARMUP_BATCH = [
+    _WARMUP_SHORT,
+    "아침에 일어나서 산책을 하고, 점심에는 친구와 맛있는 밥을 먹었다. " * 4,
+    "회사에서 일이 많아 조금 힘들었지만 집에 와서 푹 쉬었다. " * 16,
+]
+
+
+class StartupState:
+    """모델 preload/워밍업 진행 상태 (readiness 판단 및 시작 시간 보고용)"""
+
+    def __init__(self):
+        self.ready = False
+        self.error: str | None = None
+        self.timings: dict[str, float] = {}
+
+    def snapshot(self) -> dict:
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "timingsMs": {k: round(v * 1000, 1) for k, v in self.timings.items()},
+        }
+
+
+startup_state = StartupState()
+
+
+def _timed(name: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    startup_state.timings[name] = time.perf_counter() - start
+    return result
+
+
+def warm_up_emotion_model() -> None:
+    """토크나이저/모델/kss를 미리 로딩하고 더미 배치로 forward를 실행해 첫 요청 지연을 없앰"""
+    settings = get_settings()
+    started = time.perf_counter()
+    try:
+        _timed("tokenizerLoad", get_tokenizer)
+        _timed("modelLoad", lambda: get_model(settings.EMOTION_BACKEND))
+        _timed("kssLoad", lambda: split_sentences(_WARMUP_SHORT))
+        for round_ in range(settings.EMOTION_WARMUP_ROUNDS):
+            for name, texts in (("single", [_WARMUP_SHORT]), ("batch", _WARMUP_BATCH)):
+                _timed(
+                    f"warmup{name.capitalize()}{round_ + 1}",
+                    lambda texts=texts: predict_probabilities_batch(
+                        texts,
+                        padding=settings.EMOTION_PADDING,
+                        max_batch_size=settings.EMOTION_FORWARD_BATCH_SIZE,
+                        weighted=settings.EMOTION_CHUNK_WEIGHTED,
+                        backend=settings.EMOTION_BACKEND,
+                    ),
+                )
+    except Exception as e:
+        startup_state.error = str(e)
+        logger.exception("감정 분석 모델 워밍업 실패")
+        return
+    startup_state.timings["total"] = time.perf_counter() - started
+    startup_state.ready = True
+    logger.info("감정 분석 모델 준비 완료: %s", startup_state.snapshot()["timingsMs"])
@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+
+from cachetools import TTLCache
+
+from core.config import get_settings
+
+
+def normalize_text(text: str) -> str:
+    """캐시 키 용 정규화: 유니코드 NFC + 줄 단위로 연속 공백을 하나로, 빈 줄 제거 (줄바꿈 구조는 유지)"""
+    lines = unicodedata.normalize("NFC", text).splitlines()
+    return "\n".join(" ".join(line.split()) for line in lines if line.strip())
+
+
+def make_cache_key(namespace: str, version: str, text: str) -> str:
+    """정규화된 입력 + 모델/프롬프트 버전의 해시로 만든 content-addressed 키"""
+    digest = hashlib.sha256(f"{version}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class SqliteCacheTier:
+    """
+    로컬 디스크 캐시 (프로세스 재시작 후에도 유지).
+    쓰기는 대기열에 넣고 writer 스레드가 모아서 한 번에 commit (호출한 스레드/이벤트 루프를 막지 않음).
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_pending_writes: int = 1024):
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._writes: queue.Queue = queue.Queue(maxsize=max_pending_writes)
+        self.dropped_writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS result_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.prune()
+        self._writer = threading.Thread(target=self._write_loop, name="result-cache-writer", daemon=True)
+        self._writer.start()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM result_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value) -> None:
+        row = (key, json.dumps(value, ensure_ascii=False), time.time() + self.ttl)
+        try:
+            self._writes.put_nowait(row)
+        except queue.Full:
+            # 디스크가 밀리면 캐시 쓰기는 버림 (메모리 캐시에는 이미 있음)
+            self.dropped_writes += 1
+
+    def _write_loop(self) -> None:
+        while True:
+            row = self._writes.get()
+            if row is None:
+                return
+            rows = [row]
+            while True:
+                try:
+                    row = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if row is None:
+                    self._write_rows(rows)
+                    return
+                rows.append(row)
+            self._write_rows(rows)
+
+    def _write_rows(self, rows: list) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO result_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """대기 중인 쓰기를 commit 하고 writer 스레드 종료"""
+        if not self._writer.is_alive():
+            return
+        self._writes.put(None)
+        self._writer.join(timeout)
+
+    def prune(self) -> int:
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM result_cache WHERE expires_at < ?", (time.time(),)
+            ).rowcount
+            self._conn.commit()
+        return deleted
+
+
+class ResultCache:
+    """
+    감정 분석/일기 요약 결과 캐시.
+    - 1차: 메모리 LRU (크기 + TTL 제한)
+    - 2차: (선택) SQLite 디스크 캐시, 적중 시 메모리로 승격
+    키 네임스페이스(emotion, summary)별로 hit/miss 집계.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, sqlite_path: str | None = None):
+        self._memory = TTLCache(maxsize=max_size, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self._disk = SqliteCacheTier(sqlite_path, ttl_seconds) if sqlite_path else None
+        self._stats: dict[str, dict[str, int]] = {}
+
+    def _count(self, key: str, field: str) -> None:
+        namespace = key.split(":", 1)[0]
+        with self._lock:
+            stats = self._stats.setdefault(
+                namespace, {"memoryHits": 0, "diskHits": 0, "misses": 0, "bypassed": 0}
+            )
+            stats[field] += 1
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._memory.get(key)
+        if value is not None:
+            self._count(key, "memoryHits")
+            return value
+        if self._disk is not None:
+            value = self._disk.get(key)
+            if value is not None:
+                with self._lock:
+                    self._memory[key] = value
+                self._count(key, "diskHits")
+                return value
+        self._count(key, "misses")
+        return None
+
+    async def get_async(self, key: str):
+        """이벤트 루프용 get: 메모리는 바로 확인하고, 디스크 조회만 스레드에서 실행"""
+        with self._lock:
+            value = self._memory.get(key)
+        if value is not None:
+            self._count(key, "memoryHits")
+            return value
+        if self._disk is not None:
+            value = await asyncio.to_thread(self._disk.get, key)
+            if value is not None:
+                with self._lock:
+                    self._memory[key] = value
+                self._count(key, "diskHits")
+                return value
+        self._count(key, "misses")
+        return None
+
+    def set(self, key: str, value) -> None:
+        """메모리에 저장하고 디스크 쓰기는 writer 스레드에 넘김 (블로킹 없음)"""
+        with self._lock:
+            self._memory[key] = value
+        if self._disk is not None:
+            self._disk.set(key, value)
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+    def record_bypass(self, key: str) -> None:
+        self._count(key, "bypassed")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memorySize": len(self._memory),
+                "memoryMaxSize": self._memory.maxsize,
+                "disk": self._disk is not None,
+                "diskDroppedWrites": self._disk.dropped_writes if self._disk is not None else 0,
+                "namespaces": {k: dict(v) for k, v in self._stats.items()},
+            }
+
+
+def is_cache_bypassed(cache_control: str | None) -> bool:
+    """Cache-Control: no-cache 요청이면 캐시를 읽지 않고 새로 계산 (결과는 다시 저장)"""
+    if not cache_control:
+        return False
+    return "no-cache" in {d.strip().lower() for d in cache_control.split(",")}
+
+
+@lru_cache
+def get_result_cache() -> ResultCache:
+    settings = get_settings()
+    return ResultCache(
+        max_size=settings.RESULT_CACHE_MAX_SIZE,
+        ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+        sqlite_path=settings.RESULT_CACHE_SQLITE_PATH,
+    )
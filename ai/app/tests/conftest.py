@@ -0,0 +1,5 @@
+import os
+
+# 서비스 모듈이 import 시점에 설정을 읽으므로 외부 API 를 호출하지 않는 테스트용 값
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,159 @@
+import re
+
+import numpy as np
+import pytest
+import torch
+from transformers import BertTokenizerFast
+
+from models import model_def as md
+from models.bertcnn import BertCNNConfig, BertCNNForMultiLabel
+
+SENTENCES = [
+    "오늘은 좋았다.", "친구와 밥을 먹고 기분이 나빴다.", "회사에서 일이 많아 힘들었다.",
+    "집에 와서 쉬었다.", "내일은 비가 온다고 한다.", "행복했다!", "슬펐다?",
+]
+
+
+def _split_sentences(text):
+    """kss 대신 문장부호 뒤 공백에서 나누는 결정적인 분리기 (두 경로에 같은 경계를 줌)"""
+    return [s for s in re.split(r"(?<=[.!?])\s+", text) if s]
+
+
+def _old_split_long_sentence(sentence, tokenizer, max_tokens):
+    words = sentence.split()
+    chunks, current, length = [], [], 0
+    for word in words:
+        word_len = len(tokenizer.encode(word, add_special_tokens=False))
+        if length + word_len > max_tokens:
+            if current:
+                chunks.append(" ".join(current))
+            current, length = [word], word_len
+        else:
+            current.append(word)
+            length += word_len
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _old_chunk_text_with_kss(text, tokenizer, max_tokens=512):
+    """토큰 ID 기반으로 바꾸기 전의 chunk_text_with_kss (문장을 따로 인코딩하고 chunk 문자열을 다시 인코딩)"""
+    chunks, current, length = [], [], 0
+    for sentence in md.split_sentences(str(text)):
+        sentence_len = len(tokenizer.encode(sentence, add_special_tokens=True))
+        if sentence_len > max_tokens:
+            if current:
+                chunks.append(" ".join(current))
+                current = []
+            chunks.extend(_old_split_long_sentence(sentence, tokenizer, max_tokens))
+            length = 0
+            continue
+        if length + sentence_len <= max_tokens:
+            current.append(sentence)
+            length += sentence_len
+        else:
+            if current:
+                chunks.append(" ".join(current))
+            current, length = [sentence], sentence_len
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _old_probabilities(text, tokenizer, model):
+    chunks = [text]
+    if len(tokenizer.encode(text, add_special_tokens=True)) > md.MAX_TOKEN:
+        chunks = _old_chunk_text_with_kss(text, tokenizer, max_tokens=md.MAX_TOKEN)
+    probs = []
+    for chunk in chunks:
+        inputs = tokenizer(
+            chunk, return_tensors="pt", truncation=True, max_length=md.MAX_TOKEN, padding="max_length"
+        )
+        probs.append(md._forward_probs(model, inputs)[0])
+    return np.mean(probs, axis=0)
+
+
+@pytest.fixture
+def tiny_model(tmp_path, monkeypatch):
+    """실제 가중치 대신 문장 글자만 담은 WordPiece 토크나이저와 작은 랜덤 BertCNN"""
+    chars = sorted({c for s in SENTENCES for c in s if not c.isspace()})
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + chars + ["##" + c for c in chars]
+    # 실제 vocab 처럼 글자를 넘는 subword 하나 ("쉬었다행복" 이 붙어 있을 때만 쓰임)
+    vocab.append("##다행")
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab), encoding="utf-8")
+    tokenizer = BertTokenizerFast(str(vocab_file), do_lower_case=False, tokenize_chinese_chars=False)
+
+    torch.manual_seed(0)
+    config = BertCNNConfig(
+        hidden_size=32,
+        conv_output_channels=16,
+        bert_config={
+            "model_type": "bert", "vocab_size": len(vocab), "hidden_size": 32,
+            "num_hidden_layers": 2, "num_attention_heads": 2, "intermediate_size": 64,
+            "max_position_embeddings": md.MAX_TOKEN,
+        },
+    )
+    model = BertCNNForMultiLabel(config)
+    torch.nn.init.normal_(model.classifier.weight, std=0.5)
+    model.eval()
+
+    monkeypatch.setattr(md, "split_sentences", _split_sentences)
+    monkeypatch.setattr(md, "_tokenizer", tokenizer)
+    monkeypatch.setattr(md, "_models", {"torch": model})
+    return tokenizer, model
+
+
+def _long_diary(seed, sentences):
+    rng = np.random.default_rng(seed)
+    return " ".join(SENTENCES[i] for i in rng.integers(len(SENTENCES), size=sentences))
+
+
+def test_chunks_match_old_path_on_long_multi_sentence_input(tiny_model):
+    tokenizer, model = tiny_model
+    texts = [
+        _long_diary(0, 150),
+        _long_diary(1, 400),
+        # 512토큰을 넘는 한 문장은 단어 단위로 쪼개짐
+        _long_diary(2, 60) + " " + "행복했다 " * 300 + "슬펐다?",
+    ]
+    for text in texts:
+        encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        assert len(encoded["input_ids"]) > md.MAX_TOKEN
+        new_chunks = md.chunk_token_ids_with_kss(
+            text, encoded["input_ids"], encoded["offset_mapping"], max_tokens=md.MAX_TOKEN
+        )
+        old_chunks = [
+            tokenizer.encode(chunk, add_special_tokens=False)
+            for chunk in _old_chunk_text_with_kss(text, tokenizer, max_tokens=md.MAX_TOKEN)
+        ]
+        assert [len(c) for c in new_chunks] == [len(c) for c in old_chunks]
+        assert new_chunks == old_chunks
+
+    new_probs = md.predict_probabilities_batch(texts, padding="max_length")
+    for text, probs in zip(texts, new_probs):
+        old_probs = _old_probabilities(text, tokenizer, model)
+        np.testing.assert_allclose(probs, old_probs, atol=1e-5)
+        assert md.labels_from_probs(probs, md.THRESHOLD) == md.labels_from_probs(old_probs, md.THRESHOLD)
+
+
+def test_sentence_boundary_inside_word_can_shift_chunk_length(tiny_model, monkeypatch):
+    """
+    문장 경계가 공백 없이 단어 중간에 오면, 기존 경로는 두 조각을 따로 인코딩해 토큰이 하나 늘 수 있음.
+    새 경로는 원문 한 번의 토큰화 결과를 그대로 쓰므로 이런 chunk 는 기존보다 짧을 수 있음.
+    """
+    tokenizer, _ = tiny_model
+    text = "오늘은 좋았다 " * 60 + "집에 와서 쉬었다" + "행복했다 " * 60
+    cut = text.index("쉬었다") + len("쉬었다")
+    monkeypatch.setattr(md, "split_sentences", lambda t: [t[:cut], t[cut:]])
+
+    encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    new_chunks = md.chunk_token_ids_with_kss(text, encoded["input_ids"], encoded["offset_mapping"])
+    old_chunks = [
+        tokenizer.encode(chunk, add_special_tokens=False)
+        for chunk in _old_chunk_text_with_kss(text, tokenizer)
+    ]
+    # 경계에 걸친 "##다행" 은 앞 문장에 붙고, 뒤 문장은 "행" 없이 시작해 한 토큰 짧아짐
+    assert [len(c) for c in old_chunks] == [367, 240]
+    assert [len(c) for c in new_chunks] == [367, 239]
+    assert sum(len(c) for c in new_chunks) == len(encoded["input_ids"])
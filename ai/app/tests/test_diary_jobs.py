@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import pytest
+
+from services import diary_jobs
+from services.diary_jobs import DiaryJobQueue, DiaryJobStore
+
+
+@pytest.fixture
+def fake_pipeline(monkeypatch):
+    """GPT/BERT 대신 gate 가 열릴 때까지 기다렸다가 끝나는 가짜 작업"""
+    gate = {"event": None}
+
+    async def generate(raw_script):
+        await gate["event"].wait()
+        return {"title": "제목", "content": raw_script}
+
+    async def analyze(content):
+        return ["기쁜"]
+
+    monkeypatch.setattr(diary_jobs, "generate_diary_from_dialogue", generate)
+    monkeypatch.setattr(diary_jobs, "analyze_diary_emotion_async", analyze)
+    monkeypatch.setattr(diary_jobs, "get_emotion_model_version", lambda: "test")
+    return gate
+
+
+def _queue(path: str) -> DiaryJobQueue:
+    return DiaryJobQueue(
+        DiaryJobStore(path, max_jobs=100, ttl_seconds=3600),
+        workers=1,
+        max_queue_size=10,
+        callback_timeout=1,
+        callback_retries=1,
+    )
+
+
+async def _wait_for(queue: DiaryJobQueue, job_id: str, status: str) -> dict:
+    for _ in range(100):
+        job = await queue.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{job_id} 가 {status} 가 되지 않음: {job}")
+
+
+def test_resubmit_after_restart_runs_new_job(tmp_path, fake_pipeline):
+    path = str(tmp_path / "jobs.db")
+
+    async def scenario():
+        fake_pipeline["event"] = asyncio.Event()
+        first = _queue(path)
+        first.start()
+        running = await first.submit("대화 A")
+        queued = await first.submit("대화 B")
+        await _wait_for(first, running["jobId"], "running")
+        await first.stop()
+
+        second = _queue(path)
+        second.start()
+        for job in (running, queued):
+            assert (await second.get(job["jobId"]))["status"] == "failed"
+        fake_pipeline["event"].set()
+        resubmitted = await second.submit("대화 A")
+        assert resubmitted["jobId"] != running["jobId"]
+        assert second.counts["deduplicated"] == 0
+        done = await _wait_for(second, resubmitted["jobId"], "done")
+        assert done["emotionList"] == ["기쁜"]
+        await second.stop()
+
+    asyncio.run(scenario())
+
+
+def test_orphaned_job_from_dead_process_is_not_reused(tmp_path, fake_pipeline):
+    path = str(tmp_path / "jobs.db")
+    # 다른 프로세스가 만든 뒤 죽어서 heartbeat 가 끊긴 작업
+    dead = DiaryJobStore(path, max_jobs=100, ttl_seconds=3600)
+    key = diary_jobs.make_cache_key("diaryjob", f"{diary_jobs.PROMPT_VERSION}:test", "대화 A")
+    orphan, created, _ = dead.submit(key, None, None, accept_new=True)
+    assert created
+    with dead._transaction() as conn:
+        stale = time.time() - diary_jobs.STALE_AFTER_SECONDS - 1
+        conn.execute("UPDATE diary_jobs SET heartbeat_at = ?", (stale,))
+
+    async def scenario():
+        fake_pipeline["event"] = asyncio.Event()
+        fake_pipeline["event"].set()
+        queue = _queue(path)
+        queue.start()
+        job = await queue.submit("대화 A")
+        assert job["jobId"] != orphan["jobId"]
+        await _wait_for(queue, job["jobId"], "done")
+        # 살아 있는 프로세스의 heartbeat 가 고아 작업을 실패로 정리
+        assert (await _wait_for(queue, orphan["jobId"], "failed"))["error"]
+        assert queue.counts["orphaned"] == 1
+        await queue.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,31 @@
+import threading
+
+import pytest
+
+from services.emotion_batcher import EmotionBatcher, EmotionBatcherStoppedError
+
+
+def test_stop_fails_pending_futures_and_rejects_submit():
+    started = threading.Event()
+    release = threading.Event()
+
+    def predict(texts):
+        started.set()
+        release.wait(5)
+        return [[0.0] for _ in texts]
+
+    batcher = EmotionBatcher(predict, max_batch_size=1, max_wait_ms=0, max_queue_size=8)
+    running = batcher.submit("첫 번째")
+    assert started.wait(5)
+    pending = [batcher.submit(f"대기 {i}") for i in range(3)]
+
+    # 첫 배치가 끝나기 전에 stop 이 돌아오도록 짧은 timeout 을 줌
+    batcher.stop(timeout=0.1)
+    release.set()
+
+    assert running.result(5) == [0.0]
+    for future in pending:
+        with pytest.raises(EmotionBatcherStoppedError):
+            future.result(1)
+    with pytest.raises(EmotionBatcherStoppedError):
+        batcher.submit("종료 후")
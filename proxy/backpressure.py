@@ -0,0 +1,82 @@
+"""Bounded per-direction queues between the client WebSocket and the Gemini session.
+
+Each session has two queues, one per direction (client -> Gemini, Gemini -> client),
+so a slow peer on one side never stalls the read loop on the other side.
+
+When a queue reaches its high watermark, the oldest droppable items (stale realtime
+audio/image frames) are dropped until the depth falls back to the low watermark.
+Items that must not be lost (model text) are never dropped; if only such items are
+queued, the producer waits until the consumer drains the queue below the high watermark.
+"""
+import asyncio
+from collections import deque
+
+
+class BoundedFrameQueue:
+    """Single-producer / single-consumer asyncio queue with high/low watermarks."""
+
+    def __init__(self, name: str, high_watermark: int, low_watermark: int):
+        if not 0 <= low_watermark < high_watermark:
+            raise ValueError(
+                f"{name}: low watermark ({low_watermark}) must be in [0, high watermark ({high_watermark}))"
+            )
+        self.name = name
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self._items: deque = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _shed(self) -> None:
+        """Drops the oldest droppable items until the depth is back to the low watermark."""
+        excess = len(self._items) - self.low_watermark
+        kept = deque()
+        for entry in self._items:
+            if excess > 0 and entry[1]:
+                excess -= 1
+                self.dropped += 1
+                continue
+            kept.append(entry)
+        self._items = kept
+
+    async def put(self, item, droppable: bool = False) -> None:
+        if len(self._items) >= self.high_watermark:
+            self._shed()
+        while len(self._items) >= self.high_watermark:
+            # Nothing left to drop: apply backpressure to the producer instead
+            self.blocked += 1
+            self._not_full.clear()
+            await self._not_full.wait()
+        self._items.append((item, droppable))
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self._items))
+        self._not_empty.set()
+
+    async def get(self):
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        item, _ = self._items.popleft()
+        self.dequeued += 1
+        if len(self._items) <= self.low_watermark:
+            self._not_full.set()
+        return item
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self._items),
+            "maxDepth": self.max_depth,
+            "enqueued": self.enqueued,
+            "dequeued": self.dequeued,
+            "dropped": self.dropped,
+            "blocked": self.blocked,
+        }
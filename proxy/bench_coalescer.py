@@ -0,0 +1,148 @@
+"""Benchmark for the upstream PCM coalescer.
+
+Feeds synthetic 16 kHz speech/silence audio to ``PcmCoalescer`` in client-sized
+chunks on a simulated real-time clock and reports, per client chunk size:
+
+- upstream messages/sec without and with coalescing;
+- added latency (time a chunk waits in the coalescer before it is sent) p50/p99/max;
+- CPU cost of ``add()`` per chunk.
+
+Usage:
+    python bench_coalescer.py --seconds 60 --chunk-ms 10 20 40
+"""
+import argparse
+import json
+import math
+import random
+import statistics
+import time
+from collections import deque
+
+from coalescer import SAMPLE_WIDTH, PcmCoalescer
+from constants import (
+    PCM_SAMPLE_RATE,
+    SILENCE_FRAME_MS,
+    VAD_HANGOVER_MS,
+    VAD_RMS_THRESHOLD,
+    VOICE_FRAME_MS,
+)
+
+
+def synthesize(seconds: float, sample_rate: int, seed: int = 0) -> bytes:
+    """Alternating ~2 s speech-like tone bursts and ~1 s low-level noise."""
+    rng = random.Random(seed)
+    samples = []
+    t = 0
+    total = int(seconds * sample_rate)
+    while t < total:
+        speech = rng.random() < 0.6
+        length = int((rng.uniform(1.0, 3.0) if speech else rng.uniform(0.5, 1.5)) * sample_rate)
+        for i in range(min(length, total - t)):
+            noise = rng.gauss(0, 40)
+            tone = 3000 * math.sin(2 * math.pi * 180 * i / sample_rate) if speech else 0
+            samples.append(max(-32768, min(32767, int(tone + noise))))
+        t += length
+    pcm = bytearray()
+    for s in samples:
+        pcm += s.to_bytes(2, "little", signed=True)
+    return bytes(pcm)
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(pcm: bytes, chunk_ms: float, args) -> dict:
+    coalescer = PcmCoalescer(
+        sample_rate=args.sample_rate,
+        voice_frame_ms=args.voice_frame_ms,
+        silence_frame_ms=args.silence_frame_ms,
+        vad_threshold=args.vad_threshold,
+        hangover_ms=args.hangover_ms,
+    )
+    chunk_bytes = int(chunk_ms * args.sample_rate / 1000) * SAMPLE_WIDTH
+    pending = deque()  # [arrival time, bytes of the chunk not yet sent]
+    latencies = []
+    frames = 0
+    cpu = 0.0
+
+    def emit(frame: bytes, at: float) -> None:
+        nonlocal frames
+        frames += 1
+        remaining = len(frame)
+        while remaining and pending:
+            arrival, size = pending[0]
+            taken = min(size, remaining)
+            remaining -= taken
+            if taken == size:
+                pending.popleft()
+                latencies.append(at - arrival)
+            else:
+                pending[0][1] = size - taken
+
+    now = 0.0
+    for offset in range(0, len(pcm), chunk_bytes):
+        arrival = now + chunk_ms / 1000
+        # timer flush due before the next chunk arrives
+        delay = coalescer.time_until_flush(now)
+        if delay is not None and now + delay < arrival:
+            emit(coalescer.flush(), now + delay)
+        now = arrival
+        chunk = pcm[offset : offset + chunk_bytes]
+        pending.append([now, len(chunk)])
+        start = time.perf_counter()
+        frame = coalescer.add(chunk, now=now)
+        cpu += time.perf_counter() - start
+        if frame:
+            emit(frame, now)
+    leftover = coalescer.flush()
+    if leftover:
+        emit(leftover, now + (coalescer.silence_frame_ms / 1000))
+
+    audio_seconds = len(pcm) / SAMPLE_WIDTH / args.sample_rate
+    chunks = coalescer.chunks_in
+    return {
+        "chunkMs": chunk_ms,
+        "messagesPerSecBaseline": round(chunks / audio_seconds, 2),
+        "messagesPerSecCoalesced": round(frames / audio_seconds, 2),
+        "messageReduction": round(1 - frames / chunks, 3),
+        "addedLatencyMs": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2),
+            "p50": round(_percentile(latencies, 0.5) * 1000, 2),
+            "p99": round(_percentile(latencies, 0.99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2),
+        },
+        "addCpuUsPerChunk": round(cpu / chunks * 1e6, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PCM coalescer benchmark")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--chunk-ms", type=float, nargs="+", default=[10, 20, 40, 100])
+    parser.add_argument("--sample-rate", type=int, default=PCM_SAMPLE_RATE)
+    parser.add_argument("--voice-frame-ms", type=float, default=VOICE_FRAME_MS)
+    parser.add_argument("--silence-frame-ms", type=float, default=SILENCE_FRAME_MS)
+    parser.add_argument("--vad-threshold", type=float, default=VAD_RMS_THRESHOLD)
+    parser.add_argument("--hangover-ms", type=float, default=VAD_HANGOVER_MS)
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (기본값: stdout)")
+    args = parser.parse_args()
+
+    pcm = synthesize(args.seconds, args.sample_rate)
+    report = {
+        "audioSeconds": args.seconds,
+        "voiceFrameMs": args.voice_frame_ms,
+        "silenceFrameMs": args.silence_frame_ms,
+        "results": [run(pcm, chunk_ms, args) for chunk_ms in args.chunk_ms],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
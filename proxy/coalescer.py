@@ -0,0 +1,105 @@
+"""Coalescing of small upstream PCM chunks into adaptive-size frames.
+
+Mobile clients often send many tiny ``audio/pcm`` chunks; forwarding each one costs
+an upstream WebSocket message (JSON + base64) per chunk. The coalescer buffers PCM
+(16-bit little-endian mono) and emits frames of a target duration:
+
+- while the user is speaking, the target shrinks to ``voice_frame_ms`` so speech
+  reaches Gemini quickly;
+- during silence, the target grows to ``silence_frame_ms`` to save messages.
+
+Voice activity is a cheap RMS energy check with a hangover so short pauses inside
+speech do not flip the mode. A frame is emitted when it is full, or when its oldest
+byte has waited the target duration (see ``time_until_flush``), so a client that
+stops sending never leaves audio stuck in the buffer.
+"""
+import math
+import sys
+import time
+from array import array
+
+SAMPLE_WIDTH = 2  # bytes per 16-bit sample
+_VAD_STRIDE = 4  # RMS over every 4th sample is accurate enough for speech/silence
+
+
+def rms(pcm) -> float:
+    """Root-mean-square amplitude of 16-bit little-endian PCM."""
+    usable = len(pcm) - len(pcm) % SAMPLE_WIDTH
+    if not usable:
+        return 0.0
+    samples = array("h")
+    samples.frombytes(pcm[:usable])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    samples = samples[::_VAD_STRIDE]
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class PcmCoalescer:
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        voice_frame_ms: float = 40,
+        silence_frame_ms: float = 200,
+        vad_threshold: float = 500,
+        hangover_ms: float = 300,
+    ):
+        if not 0 < voice_frame_ms <= silence_frame_ms:
+            raise ValueError("voice_frame_ms must be in (0, silence_frame_ms]")
+        self.bytes_per_ms = sample_rate * SAMPLE_WIDTH / 1000
+        self.voice_frame_ms = voice_frame_ms
+        self.silence_frame_ms = silence_frame_ms
+        self.vad_threshold = vad_threshold
+        self.hangover_ms = hangover_ms
+        self._buffer = bytearray()
+        self._first_at: float | None = None
+        self._voice_until = 0.0
+        self.last_voice_at: float | None = None
+        self.chunks_in = 0
+        self.frames_out = 0
+
+    def _target_ms(self, now: float) -> float:
+        return self.voice_frame_ms if now < self._voice_until else self.silence_frame_ms
+
+    def _frame_bytes(self, now: float) -> int:
+        size = int(self._target_ms(now) * self.bytes_per_ms)
+        return max(SAMPLE_WIDTH, size - size % SAMPLE_WIDTH)
+
+    def add(self, pcm, now: float | None = None) -> bytes | None:
+        """Buffers a chunk and returns a frame once the buffer reaches the target duration."""
+        now = time.monotonic() if now is None else now
+        self.chunks_in += 1
+        if rms(pcm) >= self.vad_threshold:
+            self.last_voice_at = now
+            self._voice_until = now + self.hangover_ms / 1000
+        if not self._buffer:
+            self._first_at = now
+        self._buffer += pcm
+        # 목표 길이 이상이면 버퍼 전체를 한 프레임으로 보냄 (큰 청크를 쪼개 메시지를 늘리지 않음)
+        if len(self._buffer) < self._frame_bytes(now):
+            return None
+        return self.flush()
+
+    def time_until_flush(self, now: float | None = None) -> float | None:
+        """Seconds until the buffered audio is due, or None when the buffer is empty."""
+        if self._first_at is None:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._first_at + self._target_ms(now) / 1000 - now)
+
+    def flush(self) -> bytes | None:
+        """Returns whatever is buffered as one frame."""
+        if not self._buffer:
+            return None
+        frame = bytes(self._buffer)
+        self._buffer.clear()
+        self._first_at = None
+        self.frames_out += 1
+        return frame
+
+    def stats(self) -> dict:
+        return {
+            "chunksIn": self.chunks_in,
+            "framesOut": self.frames_out,
+            "bufferedBytes": len(self._buffer),
+        }
@@ -1,3 +1,5 @@
+import os
+
 MODEL = "gemini-2.0-flash-exp"
 INSTRUCTION = """
 당신은 사용자의 하루를 되돌아보는 대화를 도와주는 AI 어시스턴트입니다. 
@@ -10,3 +12,55 @@ INSTRUCTION = """
 5. 감정과 생각을 자유롭게 표현할 수 있도록 격려하기
 대화는 한국어로 진행하며, 자연스럽고 편안한 분위기를 만들어주세요.
 """
+
+# 방향별 버퍼 워터마크 (메시지 수). high 에 도달하면 오래된 오디오/이미지 프레임을 low 까지 버림
+UPSTREAM_QUEUE_HIGH_WATERMARK = int(os.getenv("UPSTREAM_QUEUE_HIGH_WATERMARK", 64))
+UPSTREAM_QUEUE_LOW_WATERMARK = int(os.getenv("UPSTREAM_QUEUE_LOW_WATERMARK", 32))
+DOWNSTREAM_QUEUE_HIGH_WATERMARK = int(os.getenv("DOWNSTREAM_QUEUE_HIGH_WATERMARK", 256))
+DOWNSTREAM_QUEUE_LOW_WATERMARK = int(os.getenv("DOWNSTREAM_QUEUE_LOW_WATERMARK", 128))
+
+# 업스트림 PCM 병합 (COALESCE_PCM=0 이면 클라이언트 청크를 그대로 전달)
+COALESCE_PCM = os.getenv("COALESCE_PCM", "1") != "0"
+PCM_SAMPLE_RATE = int(os.getenv("PCM_SAMPLE_RATE", 16000))
+VOICE_FRAME_MS = float(os.getenv("VOICE_FRAME_MS", 40))
+SILENCE_FRAME_MS = float(os.getenv("SILENCE_FRAME_MS", 200))
+VAD_RMS_THRESHOLD = float(os.getenv("VAD_RMS_THRESHOLD", 500))
+VAD_HANGOVER_MS = float(os.getenv("VAD_HANGOVER_MS", 300))
+
+# 로깅 / 메트릭
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# 오디오 프레임마다 찍히는 hot-path 로그를 N 번에 한 번만 DEBUG 로 출력 (0 이면 끔)
+HOT_PATH_LOG_EVERY = int(os.getenv("HOT_PATH_LOG_EVERY", 0))
+# 0 보다 크면 해당 주기(초)마다 진행 중인 세션의 메트릭을 JSON 로그로 출력
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", 0))
+
+# 멀티 워커 / 세션 제한 / graceful drain
+WORKERS = int(os.getenv("WORKERS", 1))  # 1 보다 크면 SO_REUSEPORT 로 같은 포트를 공유하는 워커 프로세스 실행
+MAX_SESSIONS_PER_WORKER = int(os.getenv("MAX_SESSIONS_PER_WORKER", 50))
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("DRAIN_TIMEOUT_SECONDS", 30))
+# WORKERS > 1 이면 워커 i 가 METRICS_PORT + i 에서 자기 /metrics 를 제공 (SO_REUSEPORT 포트의 /metrics 는 임의의 워커가 응답)
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9185))
+# 연결 후 이 시간 안에 setup 메시지를 보내지 않으면 close code 1008 로 종료 (세션 자리는 setup 후에 잡음)
+SETUP_TIMEOUT_SECONDS = float(os.getenv("SETUP_TIMEOUT_SECONDS", 10))
+# 워커가 fork 후 WORKER_RAPID_EXIT_SECONDS 안에 죽으면 연속 실패로 보고 재시작을 지수적으로 늦춤,
+# 연속 실패가 WORKER_MAX_RAPID_FAILURES 번 쌓이면 부모 프로세스도 종료 (시작 오류로 fork 를 반복하지 않도록)
+WORKER_RAPID_EXIT_SECONDS = float(os.getenv("WORKER_RAPID_EXIT_SECONDS", 10))
+WORKER_MAX_RAPID_FAILURES = int(os.getenv("WORKER_MAX_RAPID_FAILURES", 5))
+WORKER_RESTART_BACKOFF_SECONDS = float(os.getenv("WORKER_RESTART_BACKOFF_SECONDS", 1))
+WORKER_RESTART_BACKOFF_MAX_SECONDS = float(os.getenv("WORKER_RESTART_BACKOFF_MAX_SECONDS", 30))
+
+# 로컬 부하 테스트용 Gemini Live 대역 (FAKE_GEMINI=1 이면 실제 API 대신 fake_gemini.py 사용)
+FAKE_GEMINI = os.getenv("FAKE_GEMINI", "0") == "1"
+FAKE_GEMINI_MODE = os.getenv("FAKE_GEMINI_MODE", "tone")  # tone: 합성음 응답, echo: 사용자 발화 되돌려주기
+FAKE_GEMINI_CONNECT_MS = float(os.getenv("FAKE_GEMINI_CONNECT_MS", 100))
+FAKE_GEMINI_LATENCY_MS = float(os.getenv("FAKE_GEMINI_LATENCY_MS", 300))
+FAKE_GEMINI_SILENCE_MS = float(os.getenv("FAKE_GEMINI_SILENCE_MS", 500))
+FAKE_GEMINI_RESPONSE_MS = float(os.getenv("FAKE_GEMINI_RESPONSE_MS", 2000))
+FAKE_GEMINI_CHUNK_MS = float(os.getenv("FAKE_GEMINI_CHUNK_MS", 40))
+# 응답 오디오 전송 속도 (1.0 = 실시간, 0 = 지연 없이 한 번에)
+FAKE_GEMINI_SPEED = float(os.getenv("FAKE_GEMINI_SPEED", 1.0))
+
+# 통화 대화록 -> AI 서버 일기 생성 (미지정 시 전송하지 않음). 예: http://ai:8000/api/diary/sessions
+TRANSCRIPT_SUBMIT_URL = os.getenv("TRANSCRIPT_SUBMIT_URL")
+TRANSCRIPT_QUEUE_SIZE = int(os.getenv("TRANSCRIPT_QUEUE_SIZE", 100))
+TRANSCRIPT_SUBMIT_TIMEOUT_SECONDS = float(os.getenv("TRANSCRIPT_SUBMIT_TIMEOUT_SECONDS", 10))
@@ -0,0 +1,125 @@
+"""Local stand-in for ``genai.Client().aio.live.connect`` (load tests without credentials).
+
+Enabled with ``FAKE_GEMINI=1``. The fake session watches incoming PCM with the same
+RMS check as the coalescer: once voiced audio is followed by ``FAKE_GEMINI_SILENCE_MS``
+of silence, it waits ``FAKE_GEMINI_LATENCY_MS`` and answers with a synthesized tone
+(``FAKE_GEMINI_MODE=tone``) or the user's own audio (``echo``), paced at
+``FAKE_GEMINI_SPEED`` x real time, followed by ``turn_complete``.
+
+The first 16 bytes of every response audio part carry two big-endian doubles of
+``time.monotonic()``: when the fake handed the part to the proxy, and when it received
+the last voiced user audio of the turn. A load generator on the same host can then
+measure the latency the proxy adds on the downstream and upstream path.
+"""
+import asyncio
+import contextlib
+import functools
+import math
+import struct
+import time
+from types import SimpleNamespace
+
+from coalescer import SAMPLE_WIDTH, rms
+from constants import (
+    FAKE_GEMINI_CHUNK_MS,
+    FAKE_GEMINI_CONNECT_MS,
+    FAKE_GEMINI_LATENCY_MS,
+    FAKE_GEMINI_MODE,
+    FAKE_GEMINI_RESPONSE_MS,
+    FAKE_GEMINI_SILENCE_MS,
+    FAKE_GEMINI_SPEED,
+    PCM_SAMPLE_RATE,
+    VAD_RMS_THRESHOLD,
+)
+
+OUTPUT_SAMPLE_RATE = 24000
+STAMP = struct.Struct("!dd")  # (sent_at, heard_at)
+
+
+@functools.lru_cache
+def tone(milliseconds: float, sample_rate: int = OUTPUT_SAMPLE_RATE, freq: float = 220) -> bytes:
+    samples = int(sample_rate * milliseconds / 1000)
+    return b"".join(
+        int(8000 * math.sin(2 * math.pi * freq * i / sample_rate)).to_bytes(2, "little", signed=True)
+        for i in range(samples)
+    )
+
+
+def _audio_message(data: bytes, mime_type: str):
+    part = SimpleNamespace(text=None, inline_data=SimpleNamespace(data=data, mime_type=mime_type))
+    return SimpleNamespace(
+        server_content=SimpleNamespace(
+            model_turn=SimpleNamespace(parts=[part]), turn_complete=False
+        )
+    )
+
+
+_TURN_COMPLETE = SimpleNamespace(
+    server_content=SimpleNamespace(model_turn=None, turn_complete=True)
+)
+
+
+class FakeLiveSession:
+    def __init__(self):
+        self._turns: asyncio.Queue = asyncio.Queue()
+        self._heard = bytearray()
+        self._voiced = False
+        self._silence_bytes = 0
+        self._heard_at = 0.0
+        self._silence_limit = int(FAKE_GEMINI_SILENCE_MS * PCM_SAMPLE_RATE / 1000) * SAMPLE_WIDTH
+        self._tone = tone(FAKE_GEMINI_RESPONSE_MS)
+
+    async def send_realtime_input(self, *, audio=None, video=None):
+        """Takes a ``types.Blob`` like the real session; only PCM audio drives the turn."""
+        if audio is None or not audio.mime_type.startswith("audio/pcm"):
+            return
+        pcm = audio.data
+        if rms(pcm) >= VAD_RMS_THRESHOLD:
+            self._voiced = True
+            self._silence_bytes = 0
+            self._heard_at = time.monotonic()
+        elif self._voiced:
+            self._silence_bytes += len(pcm)
+        if not self._voiced:
+            return
+        if FAKE_GEMINI_MODE == "echo":
+            self._heard += pcm
+        if self._silence_bytes >= self._silence_limit:
+            self._turns.put_nowait((time.monotonic(), self._heard_at, bytes(self._heard)))
+            self._heard.clear()
+            self._voiced = False
+            self._silence_bytes = 0
+
+    async def receive(self):
+        """Yields one model turn, like the real session's ``receive()``."""
+        ended_at, heard_at, heard = await self._turns.get()
+        await asyncio.sleep(max(0.0, ended_at + FAKE_GEMINI_LATENCY_MS / 1000 - time.monotonic()))
+        if FAKE_GEMINI_MODE == "echo":
+            audio, sample_rate = heard, PCM_SAMPLE_RATE
+        else:
+            audio, sample_rate = self._tone, OUTPUT_SAMPLE_RATE
+        mime_type = f"audio/pcm;rate={sample_rate}"
+        chunk = int(sample_rate * FAKE_GEMINI_CHUNK_MS / 1000) * SAMPLE_WIDTH
+        started = time.monotonic()
+        for index, offset in enumerate(range(0, len(audio), chunk)):
+            if FAKE_GEMINI_SPEED > 0:
+                due = started + index * FAKE_GEMINI_CHUNK_MS / 1000 / FAKE_GEMINI_SPEED
+                await asyncio.sleep(max(0.0, due - time.monotonic()))
+            data = bytearray(audio[offset : offset + chunk].ljust(STAMP.size, b"\0"))
+            STAMP.pack_into(data, 0, time.monotonic(), heard_at)
+            yield _audio_message(bytes(data), mime_type)
+        yield _TURN_COMPLETE
+
+
+class _FakeLive:
+    @contextlib.asynccontextmanager
+    async def connect(self, model=None, config=None):
+        await asyncio.sleep(FAKE_GEMINI_CONNECT_MS / 1000)
+        yield FakeLiveSession()
+
+
+class FakeClient:
+    """Mimics the ``client.aio.live`` surface of ``genai.Client`` used by main.py."""
+
+    def __init__(self):
+        self.aio = SimpleNamespace(live=_FakeLive())
@@ -0,0 +1,71 @@
+"""Binary WebSocket framing for the realtime audio proxy.
+
+Clients that negotiate the ``airing.binary.v1`` subprotocol exchange raw
+PCM/JPEG bytes in binary WebSocket messages instead of base64 strings inside
+JSON. Every binary message starts with a fixed 8-byte header:
+
+    +--------+--------+----------------+--------------------------------+
+    | type   | mime   | flags          | sequence                       |
+    | uint8  | uint8  | uint16         | uint32                         |
+    +--------+--------+----------------+--------------------------------+
+    | payload (raw bytes) ...                                           |
+
+All integers are big-endian. Text messages (JSON) are still used for the
+initial ``setup`` message and for model text in both modes.
+"""
+import struct
+from typing import NamedTuple
+
+BINARY_SUBPROTOCOL = "airing.binary.v1"
+
+HEADER = struct.Struct("!BBHI")
+HEADER_SIZE = HEADER.size
+
+# Frame types
+FRAME_MEDIA = 1  # realtime media (client -> proxy) / model audio (proxy -> client)
+
+# Payload mime types
+MIME_PCM = 1
+MIME_JPEG = 2
+
+MIME_TYPES = {
+    MIME_PCM: "audio/pcm",
+    MIME_JPEG: "image/jpeg",
+}
+MIME_IDS = {name: mime_id for mime_id, name in MIME_TYPES.items()}
+
+
+class Frame(NamedTuple):
+    type: int
+    mime: int
+    flags: int
+    sequence: int
+    payload: memoryview
+
+    @property
+    def mime_type(self) -> str | None:
+        return MIME_TYPES.get(self.mime)
+
+
+def decode_frame(message: bytes) -> Frame:
+    """Parses a binary message without copying the payload."""
+    if len(message) < HEADER_SIZE:
+        raise ValueError(f"Frame too short: {len(message)} bytes")
+    view = memoryview(message)
+    frame_type, mime, flags, sequence = HEADER.unpack_from(view)
+    return Frame(frame_type, mime, flags, sequence, view[HEADER_SIZE:])
+
+
+def encode_frame(frame_type: int, mime: int, sequence: int, payload=b"", flags: int = 0) -> bytearray:
+    """Builds a binary message; the payload is copied exactly once, into the frame buffer."""
+    frame = bytearray(HEADER_SIZE + len(payload))
+    HEADER.pack_into(frame, 0, frame_type, mime, flags, sequence & 0xFFFFFFFF)
+    frame[HEADER_SIZE:] = payload
+    return frame
+
+
+def select_subprotocol(connection, subprotocols):
+    """Picks the binary subprotocol when offered; legacy clients stay on JSON."""
+    if BINARY_SUBPROTOCOL in subprotocols:
+        return BINARY_SUBPROTOCOL
+    return None
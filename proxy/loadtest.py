@@ -0,0 +1,286 @@
+"""Load generator for the realtime proxy.
+
+Starts the proxy with the local Gemini stand-in (``FAKE_GEMINI=1``), opens N
+concurrent WebSocket clients that stream PCM at real-time speed, and reports:
+
+- ``upstreamAddedLatencyMs``: client sends its last voiced chunk of a turn -> fake
+  Gemini receives it (reader, queue, coalescer and base64 re-encoding), per turn;
+- ``downstreamAddedLatencyMs``: fake Gemini hands an audio part to the proxy -> the
+  client receives it, per audio part;
+- ``addedLatencyMs``: upstream + downstream for the first audio part of each turn;
+- proxy CPU (% of one core) and RSS growth per session, read from /proc.
+
+The latencies use ``time.monotonic()`` stamps carried in the response audio (see
+fake_gemini.py), so the load generator must run on the same host as the proxy.
+
+Usage (Linux):
+    python loadtest.py --sessions 200 --seconds 30
+    python loadtest.py --sessions 200 --binary --pcm recording.raw   # raw 16 kHz s16le mono
+    python loadtest.py --url ws://host:9084 --proxy-pid 1234         # proxy already running
+"""
+import argparse
+import asyncio
+import base64
+import bisect
+import json
+import os
+import socket
+import statistics
+import struct
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+
+from bench_coalescer import synthesize
+from coalescer import SAMPLE_WIDTH, rms
+from constants import PCM_SAMPLE_RATE, VAD_RMS_THRESHOLD
+from framing import BINARY_SUBPROTOCOL, FRAME_MEDIA, MIME_PCM, decode_frame, encode_frame
+
+STAMP = struct.Struct("!dd")  # (sent_at, heard_at), see fake_gemini.py
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def _process_tree(pid: int) -> list[int]:
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        children = []
+    for child in children:
+        pids.extend(_process_tree(child))
+    return pids
+
+
+def _sample_process(pid: int) -> tuple[float, int]:
+    """(CPU seconds, RSS bytes) summed over the process and its children."""
+    cpu = 0.0
+    rss = 0
+    for p in _process_tree(pid):
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{p}/statm") as f:
+                resident_pages = int(f.read().split()[1])
+        except OSError:
+            continue
+        cpu += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime + stime
+        rss += resident_pages * os.sysconf("SC_PAGE_SIZE")
+    return cpu, rss
+
+
+def _percentiles(values: list[float]) -> dict | None:
+    if not values:
+        return None
+    values = sorted(values)
+
+    def at(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+    return {
+        "count": len(values),
+        "mean": round(statistics.fmean(values) * 1000, 2),
+        "p50": at(0.5),
+        "p99": at(0.99),
+        "max": round(values[-1] * 1000, 2),
+    }
+
+
+def _prepare_messages(pcm: bytes, chunk_ms: float, binary: bool):
+    """Pre-encodes every chunk once; all sessions share the same messages."""
+    chunk_bytes = int(PCM_SAMPLE_RATE * chunk_ms / 1000) * SAMPLE_WIDTH
+    messages = []
+    for index, offset in enumerate(range(0, len(pcm), chunk_bytes)):
+        chunk = pcm[offset : offset + chunk_bytes]
+        if binary:
+            message = bytes(encode_frame(FRAME_MEDIA, MIME_PCM, index, chunk))
+        else:
+            data = base64.b64encode(chunk).decode("ascii")
+            message = json.dumps(
+                {"realtime_input": {"media_chunks": [{"mime_type": "audio/pcm", "data": data}]}}
+            )
+        messages.append((message, rms(chunk) >= VAD_RMS_THRESHOLD))
+    return messages
+
+
+def _audio_payload(message) -> bytes | None:
+    if isinstance(message, bytes):
+        return bytes(decode_frame(message).payload)
+    data = json.loads(message)
+    if "audio" in data:
+        return base64.b64decode(data["audio"])
+    return None
+
+
+async def run_session(args, messages, results: dict) -> None:
+    subprotocols = [BINARY_SUBPROTOCOL] if args.binary else None
+    try:
+        async with websockets.connect(args.url, subprotocols=subprotocols, max_size=None) as ws:
+            await ws.send(json.dumps({"setup": {}}))
+            voiced_sent_at = []
+
+            async def sender():
+                chunk_seconds = args.chunk_ms / 1000
+                started = time.monotonic()
+                for index, (message, voiced) in enumerate(messages):
+                    await asyncio.sleep(max(0.0, started + index * chunk_seconds - time.monotonic()))
+                    await ws.send(message)
+                    if voiced:
+                        voiced_sent_at.append(time.monotonic())
+                await asyncio.sleep(args.tail)
+
+            async def receiver():
+                last_heard_at = None
+                async for message in ws:
+                    now = time.monotonic()
+                    payload = _audio_payload(message)
+                    if payload is None or len(payload) < STAMP.size:
+                        continue
+                    sent_at, heard_at = STAMP.unpack_from(payload)
+                    downstream = now - sent_at
+                    results["downstream"].append(downstream)
+                    if heard_at == last_heard_at:
+                        continue
+                    # 새 턴의 첫 오디오: fake 가 들은 마지막 발화 청크 = 그 시각 이전에 보낸 마지막 발화 청크
+                    last_heard_at = heard_at
+                    index = bisect.bisect_right(voiced_sent_at, heard_at) - 1
+                    if index >= 0:
+                        upstream = heard_at - voiced_sent_at[index]
+                        results["upstream"].append(upstream)
+                        results["added"].append(upstream + downstream)
+
+            receive_task = asyncio.create_task(receiver())
+            await sender()
+            receive_task.cancel()
+            results["completed"] += 1
+    except websockets.exceptions.ConnectionClosed as e:
+        code = e.rcvd.code if e.rcvd else None
+        results["closed"][str(code)] = results["closed"].get(str(code), 0) + 1
+    except OSError as e:
+        results["errors"].append(str(e))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _spawn_proxy(args) -> subprocess.Popen:
+    port = _free_port()
+    args.url = f"ws://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        FAKE_GEMINI="1",
+        PORT=str(port),
+        WORKERS=str(args.workers),
+        MAX_SESSIONS_PER_WORKER=str(args.sessions),
+        FAKE_GEMINI_LATENCY_MS=str(args.fake_latency_ms),
+        FAKE_GEMINI_SILENCE_MS=str(args.fake_silence_ms),
+        LOG_LEVEL="WARNING",
+    )
+    proxy = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=os.path.dirname(os.path.abspath(__file__)), env=env
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=0.5).close()
+            return proxy
+        except OSError:
+            time.sleep(0.1)
+    proxy.kill()
+    raise RuntimeError("proxy did not start")
+
+
+async def run(args) -> dict:
+    if args.pcm:
+        with open(args.pcm, "rb") as f:
+            pcm = f.read()
+    else:
+        pcm = synthesize(args.seconds, PCM_SAMPLE_RATE)
+    messages = _prepare_messages(pcm, args.chunk_ms, args.binary)
+    results = {
+        "upstream": [],
+        "downstream": [],
+        "added": [],
+        "completed": 0,
+        "closed": {},
+        "errors": [],
+    }
+
+    cpu_start, rss_start = _sample_process(args.proxy_pid)
+    rss_peak = rss_start
+    started = time.monotonic()
+    tasks = []
+    for i in range(args.sessions):
+        tasks.append(asyncio.create_task(run_session(args, messages, results)))
+        if args.ramp:
+            await asyncio.sleep(args.ramp / args.sessions)
+    pending = set(tasks)
+    while pending:
+        _, pending = await asyncio.wait(pending, timeout=0.5)
+        rss_peak = max(rss_peak, _sample_process(args.proxy_pid)[1])
+    wall = time.monotonic() - started
+    cpu_end, _ = _sample_process(args.proxy_pid)
+
+    return {
+        "sessions": args.sessions,
+        "completed": results["completed"],
+        "closed": results["closed"],
+        "errors": results["errors"][:10],
+        "binary": args.binary,
+        "audioSeconds": round(len(pcm) / SAMPLE_WIDTH / PCM_SAMPLE_RATE, 1),
+        "wallSeconds": round(wall, 1),
+        "upstreamAddedLatencyMs": _percentiles(results["upstream"]),
+        "downstreamAddedLatencyMs": _percentiles(results["downstream"]),
+        "addedLatencyMs": _percentiles(results["added"]),
+        "proxyCpuPercentPerSession": round((cpu_end - cpu_start) / wall / args.sessions * 100, 3),
+        "proxyRssMiBPerSession": round((rss_peak - rss_start) / args.sessions / 2**20, 3),
+        "proxyRssPeakMiB": round(rss_peak / 2**20, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Realtime proxy load test")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--ramp", type=float, default=5, help="세션 시작을 분산할 시간(초)")
+    parser.add_argument("--seconds", type=float, default=30, help="합성 오디오 길이 (--pcm 미지정 시)")
+    parser.add_argument("--pcm", help="16 kHz s16le mono raw PCM 파일")
+    parser.add_argument("--chunk-ms", type=float, default=20)
+    parser.add_argument("--tail", type=float, default=3, help="오디오 전송 후 응답을 기다릴 시간(초)")
+    parser.add_argument("--binary", action="store_true", help="airing.binary.v1 서브프로토콜 사용")
+    parser.add_argument("--url", help="이미 실행 중인 proxy 주소 (--proxy-pid 와 함께 사용)")
+    parser.add_argument("--proxy-pid", type=int)
+    parser.add_argument("--workers", type=int, default=1, help="직접 실행하는 proxy 의 WORKERS")
+    parser.add_argument("--fake-latency-ms", type=float, default=300)
+    parser.add_argument("--fake-silence-ms", type=float, default=500)
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (기본값: stdout)")
+    args = parser.parse_args()
+
+    proxy = None
+    if args.url is None:
+        proxy = _spawn_proxy(args)
+        args.proxy_pid = proxy.pid
+    elif args.proxy_pid is None:
+        parser.error("--url 을 지정하면 --proxy-pid 도 필요합니다 (CPU/메모리 측정용)")
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if proxy is not None:
+            proxy.terminate()
+            proxy.wait(timeout=60)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,258 @@
 # Modified from https://github.com/yeyu2/Youtube_demos/blob/main/gemini20-android/Backend/main_for_mobile.py
-# pip install --upgrade google-genai==0.5.0 websockets
+# pip install -r requirements.txt  (google-genai==1.20.0, websockets)
 import asyncio
 import base64
 import json
+import logging
 import os
+import signal
+import sys
+import time
 
 import websockets
 from google import genai
+from google.genai import types
+from websockets.asyncio.server import ServerConnection
 
-from constants import INSTRUCTION, MODEL
+from backpressure import BoundedFrameQueue
+from coalescer import PcmCoalescer
+from constants import (
+    COALESCE_PCM,
+    DRAIN_TIMEOUT_SECONDS,
+    FAKE_GEMINI,
+    DOWNSTREAM_QUEUE_HIGH_WATERMARK,
+    DOWNSTREAM_QUEUE_LOW_WATERMARK,
+    HOT_PATH_LOG_EVERY,
+    INSTRUCTION,
+    LOG_LEVEL,
+    MAX_SESSIONS_PER_WORKER,
+    METRICS_LOG_INTERVAL,
+    METRICS_PORT,
+    MODEL,
+    PCM_SAMPLE_RATE,
+    SETUP_TIMEOUT_SECONDS,
+    SILENCE_FRAME_MS,
+    TRANSCRIPT_QUEUE_SIZE,
+    TRANSCRIPT_SUBMIT_TIMEOUT_SECONDS,
+    TRANSCRIPT_SUBMIT_URL,
+    UPSTREAM_QUEUE_HIGH_WATERMARK,
+    UPSTREAM_QUEUE_LOW_WATERMARK,
+    VAD_HANGOVER_MS,
+    VAD_RMS_THRESHOLD,
+    VOICE_FRAME_MS,
+    WORKER_MAX_RAPID_FAILURES,
+    WORKER_RAPID_EXIT_SECONDS,
+    WORKER_RESTART_BACKOFF_MAX_SECONDS,
+    WORKER_RESTART_BACKOFF_SECONDS,
+    WORKERS,
+)
+from framing import (
+    BINARY_SUBPROTOCOL,
+    FRAME_MEDIA,
+    MIME_IDS,
+    MIME_PCM,
+    decode_frame,
+    encode_frame,
+    select_subprotocol,
+)
+from metrics import process_metrics_request, process_request, registry
+from transcript import Transcript, TranscriptSubmitter, enable_transcription, new_diary_session_id
+
+if FAKE_GEMINI:
+    # 로컬 부하 테스트: 실제 API 대신 fake_gemini 의 대역 사용 (API 키 불필요)
+    from fake_gemini import FakeClient
 
-# Load API key from environment
-# os.environ["GOOGLE_API_KEY"] = ""
-client = genai.Client(
-    http_options={
-        "api_version": "v1alpha",
-    }
+    client = FakeClient()
+else:
+    # Load API key from environment
+    # os.environ["GOOGLE_API_KEY"] = ""
+    client = genai.Client(
+        http_options={
+            "api_version": "v1alpha",
+        }
+    )
+logger = logging.getLogger("proxy")
+
+CLOSE_TRY_AGAIN_LATER = 1013
+CLOSE_GOING_AWAY = 1001
+CLOSE_POLICY_VIOLATION = 1008
+# SIGTERM 수신 후 True: 새 세션은 거절하고 진행 중인 통화만 마무리
+draining = False
+submitter = TranscriptSubmitter(
+    TRANSCRIPT_SUBMIT_URL, TRANSCRIPT_QUEUE_SIZE, TRANSCRIPT_SUBMIT_TIMEOUT_SECONDS
 )
 
 
-async def gemini_session_handler(client_websocket: websockets.WebSocketServerProtocol):
+def _log_sampled(count: int, message: str, *args) -> None:
+    """Hot-path debug log, emitted for every HOT_PATH_LOG_EVERY-th event (0 = off)."""
+    if HOT_PATH_LOG_EVERY and count % HOT_PATH_LOG_EVERY == 0:
+        logger.debug(message, *args)
+
+
+async def _reject(
+    client_websocket: ServerConnection,
+    reason: str,
+    code: int = CLOSE_TRY_AGAIN_LATER,
+    message: str | None = None,
+) -> None:
+    registry.sessions_rejected[reason] += 1
+    logger.warning("Rejecting session (%s, active=%d)", reason, len(registry.sessions))
+    await client_websocket.close(code, message or f"server {reason}")
+
+
+async def gemini_session_handler(client_websocket: ServerConnection):
     """Handles the interaction with Gemini API within a websocket session."""
+    connected_at = time.monotonic()
+    # Gemini 세션을 열기 전에 바로 거절: 클라이언트는 1013 을 받고 재시도 (다른 워커/인스턴스로 분산)
+    if draining:
+        await _reject(client_websocket, "draining")
+        return
+    # setup 메시지를 보내지 않는 연결이 세션 자리를 차지하지 않도록, 자리는 setup 을 받은 뒤에 잡음
+    try:
+        config_message = await asyncio.wait_for(client_websocket.recv(), SETUP_TIMEOUT_SECONDS)
+    except TimeoutError:
+        await _reject(client_websocket, "setup_timeout", CLOSE_POLICY_VIOLATION, "setup timeout")
+        return
+    except websockets.ConnectionClosed:
+        return
+    if draining or len(registry.sessions) >= MAX_SESSIONS_PER_WORKER:
+        await _reject(client_websocket, "draining" if draining else "capacity")
+        return
+
+    session_metrics = registry.open_session(str(client_websocket.id), connected_at)
     try:
-        config_message = await client_websocket.recv()
         config_data = json.loads(config_message)
         config = config_data.get("setup", {})
+        # "diary": true 를 보낸 클라이언트만 통화 종료 시 대화록을 AI 서버로 전달.
+        # 일기 조회용 세션 ID 는 서버에서 만들어 클라이언트에 알려줌 (클라이언트가 정한 값은 사용하지 않음)
+        diary_session_id = new_diary_session_id() if config_data.get("diary") else None
+        if diary_session_id:
+            enable_transcription(config)
+        transcript = Transcript()
 
         config["system_instruction"] = INSTRUCTION
+        # airing.binary.v1 을 협상한 클라이언트는 raw bytes 프레임, 그 외는 기존 JSON + base64
+        binary_mode = client_websocket.subprotocol == BINARY_SUBPROTOCOL
+        # 방향별 버퍼: 느린 클라이언트가 Gemini 수신 루프를, 느린 업스트림이 클라이언트 수신 루프를 막지 않도록 분리
+        upstream = BoundedFrameQueue(
+            "upstream", UPSTREAM_QUEUE_HIGH_WATERMARK, UPSTREAM_QUEUE_LOW_WATERMARK
+        )
+        downstream = BoundedFrameQueue(
+            "downstream", DOWNSTREAM_QUEUE_HIGH_WATERMARK, DOWNSTREAM_QUEUE_LOW_WATERMARK
+        )
+
+        coalescer = (
+            PcmCoalescer(
+                sample_rate=PCM_SAMPLE_RATE,
+                voice_frame_ms=VOICE_FRAME_MS,
+                silence_frame_ms=SILENCE_FRAME_MS,
+                vad_threshold=VAD_RMS_THRESHOLD,
+                hangover_ms=VAD_HANGOVER_MS,
+            )
+            if COALESCE_PCM
+            else None
+        )
+        session_metrics.queues = {"upstream": upstream, "downstream": downstream}
 
         async with client.aio.live.connect(model=MODEL, config=config) as session:
-            print("Connected to Gemini API")
+            session_metrics.gemini_connected()
+            if diary_session_id:
+                await client_websocket.send(json.dumps({"diary": {"sessionId": diary_session_id}}))
+            logger.info(
+                "Connected to Gemini API (session=%s, binary=%s, setup=%.0fms)",
+                session_metrics.session_id,
+                binary_mode,
+                session_metrics.setup_seconds * 1000,
+            )
 
-            async def send_to_gemini():
-                """Sends messages from the client websocket to the Gemini API."""
+            async def read_from_client():
+                """Reads media chunks from the client websocket into the upstream queue."""
                 try:
                     async for message in client_websocket:
                         try:
+                            if isinstance(message, bytes):
+                                frame = decode_frame(message)
+                                if frame.type == FRAME_MEDIA and frame.mime_type:
+                                    await upstream.put(
+                                        (frame.mime_type, frame.payload), droppable=True
+                                    )
+                                continue
                             data = json.loads(message)
                             if "realtime_input" in data:
                                 for chunk in data["realtime_input"]["media_chunks"]:
-                                    if chunk["mime_type"] == "audio/pcm":
-                                        # print(f"Chunk data size: {len(chunk['data'])}")
-                                        # print(f"Sending audio chunk: {chunk['data'][:5]}")
-                                        await session.send(
-                                            input={
-                                                "mime_type": "audio/pcm",
-                                                "data": chunk["data"],
-                                            }
-                                        )
-                                    elif chunk["mime_type"] == "image/jpeg":
-                                        print(
-                                            f"Sending image chunk: {chunk['data'][:50]}"
-                                        )
-                                        await session.send(
-                                            input={
-                                                "mime_type": "image/jpeg",
-                                                "data": chunk["data"],
-                                            }
+                                    if chunk["mime_type"] in ("audio/pcm", "image/jpeg"):
+                                        await upstream.put(
+                                            (chunk["mime_type"], chunk["data"]),
+                                            droppable=True,
                                         )
 
                         except Exception as e:
-                            print(f"Error sending to Gemini: {e}")
-                    print("Client connection closed (send)")
+                            logger.warning("Error reading from client: %s", e)
+                    logger.info("Client connection closed (send)")
+                except Exception as e:
+                    logger.warning("Error reading from client: %s", e)
+
+            async def send_media(mime_type, data):
+                if isinstance(data, str):
+                    # JSON 클라이언트의 base64 문자열은 Blob 이 bytes 로 디코딩함
+                    size = len(data) * 3 // 4
+                else:
+                    size = len(data)
+                    data = bytes(data)  # Blob 은 memoryview 를 받지 않음
+                # 1.x 에서 deprecated 된 session.send 대신 realtime input 사용 (base64 인코딩은 SDK 가 함)
+                blob = types.Blob(data=data, mime_type=mime_type)
+                try:
+                    if mime_type.startswith("audio/"):
+                        await session.send_realtime_input(audio=blob)
+                    else:
+                        await session.send_realtime_input(video=blob)
                 except Exception as e:
-                    print(f"Error sending to Gemini: {e}")
+                    logger.warning("Error sending to Gemini: %s", e)
+                    return
+                session_metrics.record("upstream", size)
+                _log_sampled(
+                    session_metrics.frames["upstream"], "Sent %s chunk (%d bytes)", mime_type, size
+                )
+
+            async def send_to_gemini():
+                """Sends queued media chunks to the Gemini API, coalescing small PCM chunks."""
+                try:
+                    while True:
+                        delay = coalescer.time_until_flush() if coalescer else None
+                        try:
+                            async with asyncio.timeout(delay):
+                                mime_type, data = await upstream.get()
+                        except TimeoutError:
+                            # 클라이언트가 멈춰도 버퍼에 남은 오디오가 묶여 있지 않도록 타이머 flush
+                            await send_media("audio/pcm", coalescer.flush())
+                            continue
+
+                        if coalescer and mime_type == "audio/pcm":
+                            if isinstance(data, str):
+                                data = base64.b64decode(data)
+                            frame = coalescer.add(data)
+                            if coalescer.last_voice_at is not None:
+                                session_metrics.user_audio(coalescer.last_voice_at)
+                            if frame:
+                                await send_media(mime_type, frame)
+                        else:
+                            if mime_type == "audio/pcm":
+                                # 병합을 끈 경우 VAD 없이 마지막 오디오 청크 시각을 기준으로 함
+                                session_metrics.user_audio()
+                            await send_media(mime_type, data)
                 finally:
-                    print("send_to_gemini closed")
+                    logger.debug("send_to_gemini closed")
 
             async def receive_from_gemini():
-                """Receives responses from the Gemini API and forwards them to the client, looping until turn is complete."""
+                """Receives responses from the Gemini API into the downstream queue, looping until turn is complete."""
+                sequence = 0
                 try:
                     while True:
                         try:
-                            print("receiving from gemini")
+                            logger.debug("receiving from gemini")
                             async for response in session.receive():
                                 if response.server_content is None:
-                                    print(f"Unhandled server message! - {response}")
+                                    logger.warning("Unhandled server message! - %s", response)
                                     continue
 
                                 model_turn = response.server_content.model_turn
@@ -85,61 +262,250 @@ async def gemini_session_handler(client_websocket: websockets.WebSocketServerPro
                                             hasattr(part, "text")
                                             and part.text is not None
                                         ):
-                                            await client_websocket.send(
-                                                json.dumps({"text": part.text})
-                                            )
+                                            session_metrics.model_output(audio=False)
+                                            transcript.add("ai", part.text)
+                                            await downstream.put(("text", part.text))
                                         elif (
                                             hasattr(part, "inline_data")
                                             and part.inline_data is not None
                                         ):
-                                            print(
-                                                "audio mime_type:",
+                                            session_metrics.model_output(audio=True)
+                                            _log_sampled(
+                                                sequence,
+                                                "audio received (mime_type=%s)",
                                                 part.inline_data.mime_type,
                                             )
-                                            base64_audio = base64.b64encode(
-                                                part.inline_data.data
-                                            ).decode("utf-8")
-
-                                            await client_websocket.send(
-                                                json.dumps({"audio": base64_audio})
+                                            # sequence 는 큐에 넣을 때 부여: 버려진 프레임은 클라이언트에서 번호 공백으로 보임
+                                            await downstream.put(
+                                                ("audio", (sequence, part.inline_data)),
+                                                droppable=True,
                                             )
+                                            sequence += 1
 
-                                            print("audio received")
-
+                                transcript.add_server_content(response.server_content)
                                 if response.server_content.turn_complete:
-                                    print("\n<Turn complete>")
+                                    session_metrics.turn_complete()
+                                    logger.debug("<Turn complete>")
 
-                        except websockets.exceptions.ConnectionClosedOK:
-                            print("Client connection closed normally (receive)")
-                            break  # Exit the loop if the connection is closed
                         except Exception as e:
-                            print(f"Error receiving from Gemini: {e}")
+                            logger.warning("Error receiving from Gemini: %s", e)
                             break
 
                 except Exception as e:
-                    print(f"Error receiving from Gemini: {e}")
+                    logger.warning("Error receiving from Gemini: %s", e)
                 finally:
-                    print("Gemini connection closed (receive)")
+                    logger.debug("Gemini connection closed (receive)")
+
+            async def send_to_client():
+                """Forwards queued Gemini responses to the client websocket."""
+                try:
+                    while True:
+                        kind, value = await downstream.get()
+                        if kind == "text":
+                            await client_websocket.send(json.dumps({"text": value}))
+                            continue
+                        if binary_mode:
+                            sequence, inline_data = value
+                            await client_websocket.send(
+                                encode_frame(
+                                    FRAME_MEDIA,
+                                    MIME_IDS.get(
+                                        (inline_data.mime_type or "").split(";")[0],
+                                        MIME_PCM,
+                                    ),
+                                    sequence,
+                                    inline_data.data,
+                                )
+                            )
+                        else:
+                            base64_audio = base64.b64encode(value[1].data).decode("utf-8")
+                            await client_websocket.send(json.dumps({"audio": base64_audio}))
+                        session_metrics.record("downstream", len(value[1].data))
+                except websockets.exceptions.ConnectionClosed:
+                    logger.info("Client connection closed (receive)")
 
-            # Start send loop
-            send_task = asyncio.create_task(send_to_gemini())
-            # Launch receive loop as a background task
-            receive_task = asyncio.create_task(receive_from_gemini())
-            await asyncio.gather(send_task, receive_task)  # 병렬 실행
+            read_task = asyncio.create_task(read_from_client())
+            pump_tasks = [
+                asyncio.create_task(send_to_gemini()),
+                asyncio.create_task(receive_from_gemini()),
+                asyncio.create_task(send_to_client()),
+            ]
+            try:
+                # 클라이언트 연결이 끊기면 세션 종료: 남은 펌프 태스크 정리
+                await read_task
+            finally:
+                for task in pump_tasks:
+                    task.cancel()
+                await asyncio.gather(*pump_tasks, return_exceptions=True)
+                if coalescer:
+                    logger.debug("Coalescer stats: %s", coalescer.stats())
+                if diary_session_id:
+                    submitter.submit(diary_session_id, transcript.messages())
 
     except Exception as e:
-        print(f"Error in Gemini session: {e}")
+        logger.exception("Error in Gemini session: %s", e)
     finally:
-        print("Gemini session closed.")
+        registry.close_session(session_metrics)
+        logger.info("Gemini session closed: %s", json.dumps(session_metrics.snapshot()))
+
+
+async def log_metrics_periodically(interval: float) -> None:
+    """Logs a JSON snapshot of every live session each interval seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        logger.info(
+            "Live sessions: %s",
+            json.dumps([s.snapshot() for s in list(registry.sessions.values())]),
+        )
+
+
+async def drain(server) -> None:
+    """Stops accepting connections and waits for live sessions, up to DRAIN_TIMEOUT_SECONDS."""
+    global draining
+    draining = True
+    logger.info(
+        "Draining %d sessions (timeout %.0fs)", len(registry.sessions), DRAIN_TIMEOUT_SECONDS
+    )
+    server.close(close_connections=False)
+    try:
+        async with asyncio.timeout(DRAIN_TIMEOUT_SECONDS):
+            await server.wait_closed()
+    except TimeoutError:
+        leftovers = server.connections
+        logger.warning("Drain timed out, closing %d sessions", len(leftovers))
+        await asyncio.gather(
+            *(c.close(CLOSE_GOING_AWAY, "server shutting down") for c in leftovers),
+            return_exceptions=True,
+        )
+        await server.wait_closed()
 
 
-async def main() -> None:
+async def _metrics_only(connection: ServerConnection) -> None:
+    """Never reached: process_metrics_request answers every request on the metrics port."""
+    await connection.close()
+
+
+async def main(worker: int | None = None) -> None:
+    loop = asyncio.get_running_loop()
+    stop = loop.create_future()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, lambda: stop.done() or stop.set_result(None))
+
+    metrics_server = None
+    if worker is not None:
+        # 워커마다 고정된 메트릭 포트: scrape 마다 다른 워커의 카운터가 섞이지 않고, drain 중에도 응답
+        registry.worker = worker
+        metrics_server = await websockets.serve(
+            _metrics_only, "0.0.0.0", METRICS_PORT + worker, process_request=process_metrics_request
+        )
+        logger.info("Serving worker %d metrics on 0.0.0.0:%d", worker, METRICS_PORT + worker)
+
     async with websockets.serve(
-        gemini_session_handler, "0.0.0.0", os.getenv("PORT", 9084)
-    ):
-        print(f"Running websocket server 0.0.0.0:{os.getenv('PORT', 9084)}...")
-        await asyncio.Future()  # Keep the server running indefinitely
+        gemini_session_handler,
+        "0.0.0.0",
+        os.getenv("PORT", 9084),
+        subprotocols=[BINARY_SUBPROTOCOL],
+        select_subprotocol=select_subprotocol,
+        process_request=process_request,
+        reuse_port=WORKERS > 1,
+    ) as server:
+        logger.info(
+            "Running websocket server 0.0.0.0:%s (pid %d)...", os.getenv("PORT", 9084), os.getpid()
+        )
+        if METRICS_LOG_INTERVAL > 0:
+            asyncio.create_task(log_metrics_periodically(METRICS_LOG_INTERVAL))
+        submit_task = asyncio.create_task(submitter.run())
+        await stop
+        await drain(server)
+        # drain 중 끝난 통화의 대화록까지 전송한 뒤 종료
+        await submitter.flush(TRANSCRIPT_SUBMIT_TIMEOUT_SECONDS)
+        submit_task.cancel()
+    if metrics_server is not None:
+        metrics_server.close()
+        await metrics_server.wait_closed()
+
+
+def run_workers(workers: int) -> None:
+    """Forks worker processes that share the port via SO_REUSEPORT and restarts crashed ones."""
+
+    def spawn(worker: int) -> int:
+        pid = os.fork()
+        if pid == 0:
+            # 부모의 _stop 핸들러를 물려받지 않도록 기본 동작으로 되돌림 (main() 이 자기 핸들러를 다시 등록)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                asyncio.run(main(worker))
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        return pid
+
+    children = {}  # pid -> (worker 번호, fork 시각); 재시작한 워커는 같은 번호(메트릭 포트)를 이어받음
+    for worker in range(workers):
+        children[spawn(worker)] = (worker, time.monotonic())
+    logger.info("Started %d workers (pids: %s)", workers, sorted(children))
+    stopping = False
+    rapid_failures = 0
+    exit_code = 0
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid not in children:
+            continue
+        worker, forked_at = children.pop(pid)
+        uptime = time.monotonic() - forked_at
+        if stopping:
+            continue
+        rapid_failures = rapid_failures + 1 if uptime < WORKER_RAPID_EXIT_SECONDS else 0
+        if rapid_failures >= WORKER_MAX_RAPID_FAILURES:
+            logger.error(
+                "Worker %d exited (%d); %d rapid failures in a row, shutting down",
+                pid, status, rapid_failures,
+            )
+            _stop(signal.SIGTERM, None)
+            exit_code = 1
+            continue
+        backoff = 0.0
+        if rapid_failures:
+            backoff = min(
+                WORKER_RESTART_BACKOFF_MAX_SECONDS,
+                WORKER_RESTART_BACKOFF_SECONDS * 2 ** (rapid_failures - 1),
+            )
+        logger.warning("Worker %d exited (%d), restarting in %.1fs", pid, status, backoff)
+        deadline = time.monotonic() + backoff
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if not stopping:
+            children[spawn(worker)] = (worker, time.monotonic())
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    logging.basicConfig(
+        level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    if WORKERS > 1:
+        run_workers(WORKERS)
+    else:
+        asyncio.run(main())
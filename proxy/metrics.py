@@ -0,0 +1,217 @@
+"""Per-session latency / traffic metrics for the realtime proxy.
+
+Every session records:
+
+- ``setupSeconds``: client connect -> Gemini Live session established;
+- ``responseLatencySeconds``: the user's last voiced audio -> first model audio byte
+  of each model turn;
+- ``turnSeconds``: first model output -> ``turn_complete``;
+- bytes/frames per direction (``upstream`` = proxy -> Gemini, ``downstream`` = proxy -> client).
+
+Aggregates are served in Prometheus text format on ``GET /metrics`` of the
+WebSocket port. With several workers each worker also serves them on its own
+``METRICS_PORT + worker`` port with a ``worker`` label, so every scrape target
+is one process whose counters only reset when that worker restarts. Per-session details are logged as JSON when a session ends (and
+periodically for live sessions when ``METRICS_LOG_INTERVAL`` is set).
+"""
+import time
+from http import HTTPStatus
+
+DIRECTIONS = ("upstream", "downstream")
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+TURN_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def render(self, labels: str = "") -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        prefix = f"{labels}," if labels else ""
+        for bound, count in zip(self.buckets, self.counts):
+            lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count}')
+        lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{self.name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{self.name}_count{suffix} {self.count}")
+        return lines
+
+
+class SessionMetrics:
+    def __init__(self, session_id: str, registry: "MetricsRegistry", connected_at: float | None = None):
+        self.session_id = session_id
+        self.registry = registry
+        self.connected_at = time.monotonic() if connected_at is None else connected_at
+        self.setup_seconds: float | None = None
+        self.bytes = dict.fromkeys(DIRECTIONS, 0)
+        self.frames = dict.fromkeys(DIRECTIONS, 0)
+        self.response_latencies: list[float] = []
+        self.turn_durations: list[float] = []
+        self.queues = {}
+        self._last_user_audio_at: float | None = None
+        self._turn_started_at: float | None = None
+        self._turn_has_audio = False
+
+    def gemini_connected(self) -> None:
+        self.setup_seconds = time.monotonic() - self.connected_at
+        self.registry.setup_seconds.observe(self.setup_seconds)
+
+    def record(self, direction: str, size: int) -> None:
+        self.bytes[direction] += size
+        self.frames[direction] += 1
+        self.registry.bytes[direction] += size
+        self.registry.frames[direction] += 1
+
+    def user_audio(self, at: float | None = None) -> None:
+        """Marks the latest user audio (last voiced chunk when the coalescer's VAD is on)."""
+        self._last_user_audio_at = time.monotonic() if at is None else at
+
+    def model_output(self, audio: bool) -> None:
+        now = time.monotonic()
+        if self._turn_started_at is None:
+            self._turn_started_at = now
+        if audio and not self._turn_has_audio:
+            self._turn_has_audio = True
+            if self._last_user_audio_at is not None:
+                latency = now - self._last_user_audio_at
+                self.response_latencies.append(latency)
+                self.registry.response_latency_seconds.observe(latency)
+
+    def turn_complete(self) -> None:
+        self._turn_has_audio = False
+        if self._turn_started_at is None:
+            return
+        duration = time.monotonic() - self._turn_started_at
+        self._turn_started_at = None
+        self.turn_durations.append(duration)
+        self.registry.turn_seconds.observe(duration)
+
+    def dropped(self, direction: str) -> int:
+        queue = self.queues.get(direction)
+        return queue.dropped if queue is not None else 0
+
+    def snapshot(self) -> dict:
+        def _ms(value):
+            return None if value is None else round(value * 1000, 1)
+
+        return {
+            "sessionId": self.session_id,
+            "durationMs": _ms(time.monotonic() - self.connected_at),
+            "setupMs": _ms(self.setup_seconds),
+            "responseLatencyMs": [_ms(v) for v in self.response_latencies],
+            "turnMs": [_ms(v) for v in self.turn_durations],
+            "bytes": dict(self.bytes),
+            "frames": dict(self.frames),
+            "queues": {name: queue.stats() for name, queue in self.queues.items()},
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        # 멀티 워커에서 워커 번호 (모든 sample 에 worker 라벨로 붙음)
+        self.worker: int | None = None
+        self.sessions: dict[str, SessionMetrics] = {}
+        self.sessions_total = 0
+        self.sessions_rejected = {"capacity": 0, "draining": 0, "setup_timeout": 0}
+        self.bytes = dict.fromkeys(DIRECTIONS, 0)
+        self.frames = dict.fromkeys(DIRECTIONS, 0)
+        self.closed_dropped = dict.fromkeys(DIRECTIONS, 0)
+        self.setup_seconds = Histogram(
+            "airing_proxy_gemini_setup_seconds",
+            "Client connect to Gemini Live session established.",
+            LATENCY_BUCKETS,
+        )
+        self.response_latency_seconds = Histogram(
+            "airing_proxy_response_latency_seconds",
+            "User's last audio frame to first model audio byte.",
+            LATENCY_BUCKETS,
+        )
+        self.turn_seconds = Histogram(
+            "airing_proxy_turn_duration_seconds",
+            "First model output to turn_complete.",
+            TURN_BUCKETS,
+        )
+
+    def open_session(self, session_id: str, connected_at: float | None = None) -> SessionMetrics:
+        session = SessionMetrics(session_id, self, connected_at)
+        self.sessions[session_id] = session
+        self.sessions_total += 1
+        return session
+
+    def close_session(self, session: SessionMetrics) -> None:
+        self.sessions.pop(session.session_id, None)
+        for direction in DIRECTIONS:
+            self.closed_dropped[direction] += session.dropped(direction)
+
+    def render(self) -> str:
+        dropped = {
+            direction: self.closed_dropped[direction]
+            + sum(s.dropped(direction) for s in self.sessions.values())
+            for direction in DIRECTIONS
+        }
+        base = f'worker="{self.worker}"' if self.worker is not None else ""
+
+        def sample(name: str, value, **labels) -> str:
+            pairs = ([base] if base else []) + [f'{k}="{v}"' for k, v in labels.items()]
+            return f"{name}{{{','.join(pairs)}}} {value}" if pairs else f"{name} {value}"
+
+        lines = [
+            "# HELP airing_proxy_sessions_active Live Gemini sessions.",
+            "# TYPE airing_proxy_sessions_active gauge",
+            sample("airing_proxy_sessions_active", len(self.sessions)),
+            "# HELP airing_proxy_sessions_total Sessions accepted since start.",
+            "# TYPE airing_proxy_sessions_total counter",
+            sample("airing_proxy_sessions_total", self.sessions_total),
+            "# HELP airing_proxy_sessions_rejected_total Sessions rejected before opening Gemini (1013, or 1008 on setup timeout).",
+            "# TYPE airing_proxy_sessions_rejected_total counter",
+        ]
+        for reason, count in self.sessions_rejected.items():
+            lines.append(sample("airing_proxy_sessions_rejected_total", count, reason=reason))
+        for name, help_text, values in (
+            ("airing_proxy_bytes_total", "Media payload bytes forwarded.", self.bytes),
+            ("airing_proxy_frames_total", "Media frames forwarded.", self.frames),
+            ("airing_proxy_dropped_frames_total", "Stale frames dropped by backpressure.", dropped),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for direction in DIRECTIONS:
+                lines.append(sample(name, values[direction], direction=direction))
+        for histogram in (self.setup_seconds, self.response_latency_seconds, self.turn_seconds):
+            lines.extend(histogram.render(base))
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def process_request(connection, request):
+    """Serves ``GET /metrics`` on the WebSocket port; other paths continue the handshake."""
+    if request.path != "/metrics":
+        return None
+    response = connection.respond(HTTPStatus.OK, registry.render())
+    del response.headers["Content-Type"]
+    response.headers["Content-Type"] = PROMETHEUS_CONTENT_TYPE
+    return response
+
+
+def process_metrics_request(connection, request):
+    """``process_request`` for the per-worker metrics port: only ``GET /metrics``, never a WebSocket."""
+    return process_request(connection, request) or connection.respond(
+        HTTPStatus.NOT_FOUND, "Not Found\n"
+    )
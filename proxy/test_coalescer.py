@@ -0,0 +1,32 @@
+import struct
+
+from coalescer import PcmCoalescer, rms
+from framing import FRAME_MEDIA, MIME_PCM, decode_frame, encode_frame
+
+
+def _pcm(amplitude: int, samples: int = 640) -> bytes:
+    """16-bit little-endian PCM alternating +amplitude / -amplitude (RMS == amplitude)."""
+    return struct.pack(f"<{samples}h", *([amplitude, -amplitude] * (samples // 2)))
+
+
+def test_rms_reads_int16_samples():
+    assert rms(_pcm(1000)) == 1000.0
+    assert rms(b"") == 0.0
+
+
+def test_rms_memoryview_matches_bytes():
+    pcm = _pcm(1000)
+    assert rms(memoryview(pcm)) == rms(pcm) == 1000.0
+    # binary framing 은 payload 를 memoryview 로 넘김
+    payload = decode_frame(encode_frame(FRAME_MEDIA, MIME_PCM, 0, pcm)).payload
+    assert isinstance(payload, memoryview)
+    assert rms(payload) == 1000.0
+
+
+def test_coalescer_detects_voice_in_memoryview_chunks():
+    coalescer = PcmCoalescer(vad_threshold=500, voice_frame_ms=40, silence_frame_ms=200)
+    chunk = memoryview(_pcm(1000, samples=320))  # 20 ms at 16 kHz
+    assert coalescer.add(chunk, now=0.0) is None
+    frame = coalescer.add(chunk, now=0.02)
+    # 발화로 판정되면 40 ms 에서 바로 프레임이 나감 (침묵이면 200 ms 까지 모음)
+    assert frame is not None and len(frame) == 2 * len(chunk)
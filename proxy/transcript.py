@@ -0,0 +1,117 @@
+"""Per-session transcript and hand-off to the AI server's diary pipeline.
+
+The proxy already sees the model's text (and, when transcription is enabled in the
+``setup`` config, ``input_transcription`` / ``output_transcription`` fragments). It
+keeps one compact transcript per session, in the AI server's ``Message`` shape
+(``{"from": "user" | "ai", "message": ...}``), with consecutive fragments from the
+same speaker merged.
+
+Clients opt in by sending ``"diary": true`` next to ``setup`` in their first
+message. The proxy then turns on input/output audio transcription in the Live
+config, generates an unguessable diary session id and sends it to the client as
+``{"diary": {"sessionId": ...}}``. When the session ends, a transcript that contains
+at least one user turn goes through a bounded local queue to
+``TRANSCRIPT_SUBMIT_URL`` (the AI server's ``POST /api/diary/sessions``), so the
+diary is being generated as soon as the call ends.
+"""
+import asyncio
+import logging
+import uuid
+
+import requests
+
+logger = logging.getLogger("proxy")
+
+
+def new_diary_session_id() -> str:
+    """Server-side id: the client only learns it from the proxy, it cannot pick or guess one."""
+    return uuid.uuid4().hex
+
+
+def enable_transcription(config: dict) -> None:
+    """Asks the Live API for transcripts of the user's speech (and the model's, for audio output)."""
+    config.setdefault("input_audio_transcription", {})
+    modalities = config.get("response_modalities") or (config.get("generation_config") or {}).get(
+        "response_modalities"
+    )
+    if not modalities or "AUDIO" in [str(m).upper() for m in modalities]:
+        config.setdefault("output_audio_transcription", {})
+
+
+class Transcript:
+    def __init__(self):
+        self._messages: list[list[str]] = []  # [speaker, text]
+
+    def add(self, speaker: str, text: str | None) -> None:
+        if not text:
+            return
+        if self._messages and self._messages[-1][0] == speaker:
+            self._messages[-1][1] += text
+        else:
+            self._messages.append([speaker, text])
+
+    def add_server_content(self, server_content) -> None:
+        """Collects transcription fragments when the Live API sends them."""
+        for speaker, field in (("user", "input_transcription"), ("ai", "output_transcription")):
+            transcription = getattr(server_content, field, None)
+            if transcription is not None:
+                self.add(speaker, getattr(transcription, "text", None))
+
+    def messages(self) -> list[dict]:
+        return [
+            {"from": speaker, "message": " ".join(text.split())}
+            for speaker, text in self._messages
+            if text.strip()
+        ]
+
+
+class TranscriptSubmitter:
+    """Bounded queue + one background task that POSTs finished transcripts."""
+
+    def __init__(self, url: str | None, max_queue: int, timeout: float):
+        self.url = url
+        self.timeout = timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.submitted = 0
+        self.failed = 0
+        self.dropped = 0
+        self.skipped = 0
+
+    def submit(self, session_id: str, messages: list[dict]) -> None:
+        if not self.url:
+            return
+        if not any(message["from"] == "user" for message in messages):
+            # 사용자 발화가 없으면 AI 쪽 말만으로 일기를 쓰게 되므로 보내지 않음
+            self.skipped += 1
+            logger.info("Transcript has no user turn, not submitting session %s", session_id)
+            return
+        try:
+            self._queue.put_nowait({"sessionId": session_id, "messages": messages})
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Transcript queue full, dropping session %s", session_id)
+
+    def _post(self, payload: dict) -> None:
+        response = requests.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+    async def run(self) -> None:
+        while True:
+            payload = await self._queue.get()
+            try:
+                # requests 는 blocking 이라 이벤트 루프(오디오 중계)를 막지 않도록 스레드에서 실행
+                await asyncio.to_thread(self._post, payload)
+                self.submitted += 1
+            except Exception as e:
+                self.failed += 1
+                logger.warning("Transcript submit failed (session %s): %s", payload["sessionId"], e)
+            finally:
+                self._queue.task_done()
+
+    async def flush(self, timeout: float) -> None:
+        """Waits for queued transcripts to be sent (used while draining)."""
+        try:
+            async with asyncio.timeout(timeout):
+                await self._queue.join()
+        except TimeoutError:
+            logger.warning("Transcript flush timed out, %d not sent", self._queue.qsize())